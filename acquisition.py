@@ -0,0 +1,357 @@
+# acquisition.py
+# Per-device acquisition pipeline and a manager for many concurrent serial ports
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+import argparse
+import threading
+import time
+from datetime import datetime
+
+import serial
+
+from ring_buffer import RingBuffer
+from running_stats import SensorStats
+from rollup import RollupStore
+from alerts import AlertEngine
+from log_writer import BatchedCSVWriter, LogWriterError, format_row, open_csv_log
+from log_rotation import ROTATE_INTERVALS, LogRotation
+from log_index import BLOCK_ROWS as INDEX_BLOCK_ROWS
+from binary_log import BinaryLogWriter
+from frame_parser import ParseError
+from framing import BLOCK_SIZE, PROTOCOLS, ChunkedReader
+from metrics import MetricsRegistry
+from profiling import profiler
+
+CHANNELS = ("temp", "hum", "pres", "lux", "wind")
+CSV_HEADER = ["timestamp", *CHANNELS]
+
+# Error counters kept per device, one per frame_parser.ParseError
+ERROR_KINDS = tuple(code.name.lower() for code in ParseError if code)
+
+# Message printed for each rejected line
+ERROR_MESSAGES = {
+    ParseError.NO_DATA: "No data received from Arduino",
+    ParseError.MISSING_CHECKSUM: "Checksum not transmitted error has occured",
+    ParseError.INVALID_CHECKSUM: "Invalid checksum",
+    ParseError.CORRUPTED: "Data has been corrupted",
+    ParseError.WRONG_FIELD_COUNT: "Number of elements in line error has occured",
+    ParseError.PARSE_ERROR: None,
+}
+
+# Metric family each rejected frame is counted in (labelled with its kind)
+ERROR_METRICS = {
+    ParseError.NO_DATA: ("weather_serial_timeouts_total", "Serial reads that timed out with no data"),
+    ParseError.MISSING_CHECKSUM: ("weather_malformed_frames_total", "Frames without a valid structure"),
+    ParseError.INVALID_CHECKSUM: ("weather_malformed_frames_total", "Frames without a valid structure"),
+    ParseError.CORRUPTED: ("weather_checksum_failures_total", "Frames whose checksum or CRC did not match"),
+    ParseError.WRONG_FIELD_COUNT: ("weather_malformed_frames_total", "Frames without a valid structure"),
+    ParseError.PARSE_ERROR: ("weather_parse_errors_total", "Frames with a value that is not a number"),
+}
+
+
+# One Arduino: its serial port, buffers, statistics, rollups, log files and counters.
+# serial_factory(port, baud_rate, timeout) opens the port; pass a
+# simulator.SimulatedSerial factory to run without hardware. Its metrics are
+# registered in `metrics` (a metrics.MetricsRegistry) labelled with its name.
+class Device:
+    # Formats queued samples into CSV rows on the writer thread
+    csv_formatter = staticmethod(format_row)
+
+    def __init__(self, name, port, baud_rate=9600, log_file=None, binary_log_file=None,
+                 buffer=None, stats=None, rollups=None, alerts=None, buffer_size=200000,
+                 flush_rows=50, flush_interval=1.0, fsync="never", index_rows=INDEX_BLOCK_ROWS,
+                 rotate_interval=None, rotate_bytes=None, compress="gzip",
+                 serial_factory=serial.Serial,
+                 block_size=BLOCK_SIZE, protocol="auto", metrics=None):
+        self.name = name
+        self.port = port
+        self.baud_rate = baud_rate
+        self.log_file = log_file if log_file is not None else f"weather_monitoring_{name}.csv"
+        self.binary_log_file = binary_log_file
+        self.buffer = buffer if buffer is not None else RingBuffer(buffer_size, CHANNELS)
+        self.stats = stats if stats is not None else SensorStats(CHANNELS)
+        # min/max/mean per second, minute and hour, kept after the raw samples are overwritten
+        self.rollups = rollups if rollups is not None else RollupStore(CHANNELS)
+        # Threshold alerts (alerts.DEFAULT_RULES unless an engine is given)
+        self.alerts = alerts if alerts is not None else AlertEngine(CHANNELS)
+        self.alerts.add_listener(self._alert)
+        self.log_options = (flush_rows, flush_interval, fsync)
+        self.index_rows = index_rows    # rows per log_index block (None: no index)
+        # Log segments: "hourly"/"daily"/seconds and/or a size in bytes (None: one file)
+        self.rotate_options = (rotate_interval, rotate_bytes, compress)
+        self.serial_factory = serial_factory
+        self.block_size = block_size
+        self.protocol = protocol
+        self.reader = None          # ChunkedReader, once the port is open
+        self.server = None          # SampleServer publishing this device's samples
+        self.csv_log = None         # BatchedCSVWriter, while running
+        self.samples = 0
+        self.unlogged = 0           # samples kept but not logged after the CSV writer failed
+        self.errors = dict.fromkeys(ERROR_KINDS, 0)
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._register_metrics()
+
+    # Hot path counters are updated in place; the rest is read when scraped
+    def _register_metrics(self):
+        m, name = self.metrics, self.name
+        self.frames_received = m.counter("weather_frames_received_total",
+                                         "Frames split out of the serial stream", device=name)
+        self.led_commands = m.counter("weather_led_commands_total", "LED_ON commands sent", device=name)
+        self.error_counters = {code: m.counter(*ERROR_METRICS[code], device=name, kind=code.name.lower())
+                               for code in ParseError if code}
+        self.parse_time = m.histogram("weather_frame_parse_seconds", "Decode time per frame", device=name)
+        self.write_latency = m.histogram("weather_read_to_csv_seconds",
+                                         "Time from serial read to the CSV row being written", device=name)
+        m.callback("weather_samples_total", "Samples accepted", lambda: self.samples, device=name)
+        m.callback("weather_buffer_evictions_total", "Samples overwritten in the ring buffer",
+                   lambda: max(self.buffer.count - self.buffer.capacity, 0), device=name)
+        m.callback("weather_csv_rows_total", "Rows written to the CSV log",
+                   lambda: self.csv_log.rows_written if self.csv_log is not None else 0, device=name)
+        m.callback("weather_csv_bytes_total", "Bytes flushed to the CSV log",
+                   lambda: self.csv_log.bytes_written if self.csv_log is not None else 0, device=name)
+        m.callback("weather_csv_dropped_total", "Rows dropped because the CSV writer fell behind",
+                   lambda: self.csv_log.dropped if self.csv_log is not None else 0, device=name)
+        m.callback("weather_csv_unlogged_total", "Samples not logged because the CSV writer failed",
+                   lambda: self.unlogged, device=name)
+        m.callback("weather_clients_dropped_total", "Sample clients disconnected for falling behind",
+                   lambda: self.server.dropped_clients if self.server is not None else 0, device=name)
+        for rule in self.alerts.rules:
+            m.callback("weather_alert_active", "1 while the alert rule is raised",
+                       lambda rule=rule: int(self.alerts.intervals(rule).is_open), kind="gauge",
+                       device=name, rule=rule)
+
+    @property
+    def error_count(self):
+        return sum(self.errors.values())
+
+    # Accepted samples per second since the device was started
+    @property
+    def rate(self):
+        if self.started_at is None:
+            return 0.0
+        return self.samples / max(time.monotonic() - self.started_at, 1e-9)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=f"reader-{self.name}", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _error(self, code, message):
+        self.errors[code.name.lower()] += 1
+        self.error_counters[code].inc()
+        if message:
+            print(f"{self.name}: {message}")
+
+    def _alert(self, alert):
+        state = "raised" if alert.raised else "cleared"
+        print(f"{self.name}: alert {alert.rule} {state} ({alert.value:.2f})")
+
+    # Flash LED by sending command to serial
+    def _flash_led(self, ser):
+        ser.write(b"LED_ON\n")
+        ser.flush()
+        self.led_commands.inc()
+
+    # Read from and write to serial until stopped (blocking)
+    def run(self):
+        # Communications protocol (an existing log is appended to, not wiped)
+        open_csv_log(self.log_file, CSV_HEADER)
+
+        # Check if Arduino port can be accessed
+        try:
+            ser = self.serial_factory(self.port, self.baud_rate, timeout=1)
+        except serial.SerialException:
+            print("Could not open", self.port)
+            return
+
+        # Rows are handed to a separate writer thread which batches the file I/O
+        rotation = None
+        if self.rotate_options[0] or self.rotate_options[1]:
+            rotation = LogRotation(self.log_file, CSV_HEADER, *self.rotate_options)
+        csv_log = BatchedCSVWriter(self.log_file, *self.log_options, formatter=self.csv_formatter,
+                                   index_rows=self.index_rows, rotation=rotation,
+                                   latency=self.write_latency).start()
+        self.csv_log = csv_log
+
+        bin_log = None
+        if self.binary_log_file:
+            bin_log = BinaryLogWriter(self.binary_log_file)
+
+        # Frames are split out of whatever bytes the port has buffered, as
+        # text lines or binary frames (auto-detected unless protocol is given)
+        self.reader = ChunkedReader(ser, self.block_size, protocol=self.protocol)
+        self.reader.parse_time = self.parse_time
+
+        self.started_at = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                frames = self.reader.read_samples()
+
+                # Check if data has been transmitted
+                if frames is None:
+                    self._error(ParseError.NO_DATA, ERROR_MESSAGES[ParseError.NO_DATA])
+                    continue
+                if not frames:
+                    continue
+                self.frames_received.inc(len(frames))
+
+                with profiler.span("reader.frames"):
+                    prev_ns = 0
+                    for code, sample in frames:
+                        if code:
+                            self._error(code, ERROR_MESSAGES[code])
+                            # Flash LED for frames that arrived but failed validation
+                            if code >= ParseError.INVALID_CHECKSUM:
+                                self._flash_led(ser)
+                            continue
+
+                        # Obtaining time stamp, one per frame: a burst read in
+                        # one go still gets strictly increasing stamps (at
+                        # least 1 us apart, so they stay distinct in the CSV)
+                        ts_ns = time.time_ns()
+                        if ts_ns <= prev_ns:
+                            ts_ns = prev_ns + 1000
+                        prev_ns = ts_ns
+                        now = datetime.fromtimestamp(ts_ns // 1_000_000_000).replace(
+                            microsecond=ts_ns // 1000 % 1_000_000)
+
+                        # Add latest value to buffers (oldest sample is overwritten once full)
+                        self.buffer.append(ts_ns, sample)
+                        self.stats.update(ts_ns, sample)
+                        self.rollups.update(ts_ns, sample)
+                        self.alerts.update(ts_ns, sample)
+                        self.samples += 1
+                        if self.server is not None:
+                            self.server.publish(self.buffer.count - 1, ts_ns, sample)
+
+                        # Queue latest data for the log file. If the writer
+                        # failed (e.g. disk full) acquisition carries on: the
+                        # error is reported once and unlogged rows counted
+                        try:
+                            csv_log.write((now, *sample))
+                        except LogWriterError as e:
+                            if not self.unlogged:
+                                print(f"{self.name}: {e}; samples are no longer logged to CSV")
+                            self.unlogged += 1
+                        if bin_log is not None:
+                            bin_log.append(ts_ns, sample)
+        finally:
+            ser.close()
+            try:
+                csv_log.close()
+            except LogWriterError:
+                pass                # already reported by the writer thread
+            finally:
+                if bin_log is not None:
+                    bin_log.close()
+
+
+# Runs many devices concurrently, one reader thread per serial port, so a slow
+# or silent device never holds up the others
+class AcquisitionManager:
+    def __init__(self):
+        self.devices = {}
+        self.metrics = MetricsRegistry()    # shared by the devices, labelled per device
+        self._last = {}     # name -> (monotonic time, samples) at the previous summary
+
+    def add(self, name, port, **options):
+        if name in self.devices:
+            raise ValueError(f"device {name!r} already added")
+        options.setdefault("metrics", self.metrics)
+        device = Device(name, port, **options)
+        self.devices[name] = device
+        return device
+
+    def start(self):
+        for device in self.devices.values():
+            device.start()
+
+    def stop(self):
+        for device in self.devices.values():
+            device._stop.set()
+        for device in self.devices.values():
+            device.stop()
+
+    # Per-device throughput and error counts; "recent_rate" covers the time
+    # since the previous call
+    def summary(self):
+        now = time.monotonic()
+        result = {}
+        for name, device in self.devices.items():
+            t_prev, n_prev = self._last.get(name, (device.started_at or now, 0))
+            recent = (device.samples - n_prev) / (now - t_prev) if now > t_prev else 0.0
+            self._last[name] = (now, device.samples)
+            result[name] = {
+                "port": device.port,
+                "samples": device.samples,
+                "rate": device.rate,
+                "recent_rate": recent,
+                "errors": device.error_count,
+                "error_kinds": dict(device.errors),
+                **(device.reader.counters if device.reader is not None else {}),
+            }
+        return result
+
+    def report(self):
+        lines = [f"{'device':<12}{'port':<16}{'samples':>10}{'rate/s':>9}{'recent/s':>10}{'errors':>8}{'dropped':>9}"]
+        total_samples = total_errors = total_dropped = 0
+        total_rate = 0.0
+        for name, s in self.summary().items():
+            dropped = s.get("dropped", 0)
+            lines.append(f"{name:<12}{s['port']:<16}{s['samples']:>10}{s['rate']:>9.2f}{s['recent_rate']:>10.2f}{s['errors']:>8}{dropped:>9}")
+            total_samples += s["samples"]
+            total_errors += s["errors"]
+            total_dropped += dropped
+            total_rate += s["recent_rate"]
+        lines.append(f"{'total':<28}{total_samples:>10}{'':>9}{total_rate:>10.2f}{total_errors:>8}{total_dropped:>9}")
+        return "\n".join(lines)
+
+
+# Headless multi-station logger: python acquisition.py --device north=COM9 --device south=COM10
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Log several weather stations concurrently")
+    parser.add_argument("--device", action="append", required=True, metavar="NAME=PORT",
+                        help="station name and serial port (repeat for each station)")
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--buffer-size", type=int, default=200000, help="samples kept in memory per device")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="seconds between status reports")
+    parser.add_argument("--protocol", choices=PROTOCOLS, default="auto",
+                        help="serial framing: checksummed text lines, binary frames or auto-detect")
+    parser.add_argument("--rotate", choices=tuple(ROTATE_INTERVALS), help="start a new log segment every hour/day")
+    parser.add_argument("--metrics", metavar="HOST:PORT",
+                        help="serve Prometheus metrics (/metrics) and JSON (/metrics.json) here")
+    args = parser.parse_args(argv)
+
+    manager = AcquisitionManager()
+    for spec in args.device:
+        name, _, port = spec.partition("=")
+        if not port:
+            parser.error(f"--device expects NAME=PORT, got {spec!r}")
+        manager.add(name, port, baud_rate=args.baud, buffer_size=args.buffer_size, protocol=args.protocol,
+                    rotate_interval=args.rotate)
+
+    if args.metrics:
+        host, _, port = args.metrics.rpartition(":")
+        print("Serving metrics on http://%s:%d/metrics" % manager.metrics.serve(host or "127.0.0.1", int(port)).address)
+    manager.start()
+    try:
+        while True:
+            time.sleep(args.report_interval)
+            print(manager.report())
+    except KeyboardInterrupt:
+        manager.stop()
+
+
+if __name__ == "__main__":
+    main()
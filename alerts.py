@@ -0,0 +1,352 @@
+# alerts.py
+# Threshold and rate-of-change alerts with hysteresis and a minimum duration,
+# evaluated as samples arrive, with an index of the intervals they were raised
+# SF4: Data Logger
+# jz587 and ak2444
+
+# A rule watches one channel (or, with rate=True, its rate of change per
+# second). It is raised once the value has been past `threshold` for
+# `min_duration` seconds, and cleared only when it is back by more than
+# `hysteresis`, so a reading hovering on the threshold does not flicker. Each
+# raised period is kept as an interval starting when the value first crossed.
+# Live samples go through update(); a batch or a historical log is evaluated in
+# one vectorised pass (extend, replay) with the same result.
+
+# Import Necessary Modules
+import argparse
+import itertools
+import json
+import sys
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+from binary_log import CHANNELS, iso_to_ns
+from log_rotation import read_log
+
+_OPEN = np.iinfo(np.int64).max     # end of an interval that is still open
+_NAN = float("nan")
+REPLAY_CHUNK = 65536        # rows evaluated per step by replay()
+
+
+class AlertRule(NamedTuple):
+    name: str
+    channel: str
+    threshold: float
+    above: bool = True          # raise above the threshold (False: below)
+    hysteresis: float = 0.0     # how far back past the threshold clears it
+    min_duration: float = 0.0   # seconds past the threshold before raising
+    rate: bool = False          # watch the change per second, not the value
+
+
+# temp_high and lux_low mirror the red and green LED thresholds (and
+# hysteresis) in final_firmware.ino; the firmware has no humidity LED, so
+# hum_high keeps the 60 % threshold the live plots used to mark
+DEFAULT_RULES = (
+    AlertRule("temp_high", "temp", 26.0, above=True, hysteresis=0.5),
+    AlertRule("hum_high", "hum", 60.0, above=True, hysteresis=2.0),
+    AlertRule("lux_low", "lux", 100.0, above=False, hysteresis=10.0),
+)
+
+
+# A rule being raised or cleared
+class Alert(NamedTuple):
+    rule: str
+    raised: bool
+    timestamp: int      # epoch ns of the sample that raised or cleared it
+    value: float
+
+
+# Rules from a JSON list of AlertRule fields, e.g.
+# [{"name": "temp_high", "channel": "temp", "threshold": 28, "hysteresis": 1}]
+def load_rules(path):
+    with open(path) as f:
+        return tuple(AlertRule(**spec) for spec in json.load(f))
+
+
+# Start/end (epoch ns) of every raised interval of one rule, oldest first, in
+# growable arrays; an open interval ends at _OPEN. The oldest intervals are
+# dropped beyond `capacity`.
+class IntervalIndex:
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.starts = np.zeros(64, dtype=np.int64)
+        self.ends = np.zeros(64, dtype=np.int64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def is_open(self):
+        return self.count > 0 and self.ends[self.count - 1] == _OPEN
+
+    def _reserve(self, n):
+        if self.count + n > self.capacity:
+            drop = min(self.count + n - self.capacity, self.count)
+            self.starts[:self.count - drop] = self.starts[drop:self.count]
+            self.ends[:self.count - drop] = self.ends[drop:self.count]
+            self.count -= drop
+        if self.count + n > len(self.starts):
+            size = max(2 * len(self.starts), self.count + n)
+            self.starts = np.resize(self.starts, size)
+            self.ends = np.resize(self.ends, size)
+
+    def open(self, start):
+        self._reserve(1)
+        self.starts[self.count] = start
+        self.ends[self.count] = _OPEN
+        self.count += 1
+
+    def close(self, end):
+        self.ends[self.count - 1] = end
+
+    # Append many intervals at once (ends may contain _OPEN for the last one)
+    def extend(self, starts, ends):
+        n = len(starts)
+        if n > self.capacity:
+            starts, ends, n = starts[-self.capacity:], ends[-self.capacity:], self.capacity
+        self._reserve(n)
+        self.starts[self.count:self.count + n] = starts
+        self.ends[self.count:self.count + n] = ends
+        self.count += n
+
+    # Intervals overlapping [t0, t1] (epoch ns; None for open ended) as
+    # (starts, ends); an open interval ends at `now` (default: still _OPEN)
+    def query(self, t0=None, t1=None, now=None):
+        starts, ends = self.starts[:self.count], self.ends[:self.count]
+        lo = 0 if t0 is None else int(np.searchsorted(ends, t0, side="right"))
+        hi = self.count if t1 is None else int(np.searchsorted(starts, t1, side="right"))
+        starts, ends = starts[lo:hi].copy(), ends[lo:hi].copy()
+        if now is not None and len(ends) and ends[-1] == _OPEN:
+            ends[-1] = now
+        return starts, ends
+
+    # True for each timestamp (sorted) inside a raised interval
+    def mask(self, timestamps):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if not self.count or not len(timestamps):
+            return np.zeros(len(timestamps), dtype=bool)
+        starts, ends = self.query(int(timestamps[0]), int(timestamps[-1]))
+        if not len(starts):
+            return np.zeros(len(timestamps), dtype=bool)
+        i = np.searchsorted(starts, timestamps, side="right") - 1
+        return (i >= 0) & (timestamps < ends[np.maximum(i, 0)])
+
+    def clear(self):
+        self.count = 0
+
+
+# Incremental state of one rule
+class _RuleState:
+    __slots__ = ("rule", "column", "raised", "pending", "last_ts", "last_value", "exceeded", "intervals")
+
+    def __init__(self, rule, column, capacity):
+        self.rule = rule
+        self.column = column        # index of the channel in a sample
+        self.raised = False
+        self.pending = None         # time the value first crossed, while waiting out min_duration
+        self.last_ts = None         # previous sample, for rate rules
+        self.last_value = None
+        self.exceeded = 0           # samples past the threshold, raised or not
+        self.intervals = IntervalIndex(capacity)
+
+
+# Evaluates every rule on each sample (values in channel order). Listeners
+# are called with an Alert whenever a rule is raised or cleared.
+class AlertEngine:
+    def __init__(self, channels, rules=DEFAULT_RULES, max_intervals=10000):
+        self.channels = tuple(channels)
+        self.rules = {}
+        self._states = []
+        self.listeners = []
+        for rule in rules:
+            if rule.name in self.rules:
+                raise ValueError(f"duplicate alert rule {rule.name!r}")
+            if rule.channel not in self.channels:
+                raise ValueError(f"alert rule {rule.name!r}: unknown channel {rule.channel!r}")
+            self.rules[rule.name] = rule
+            self._states.append(_RuleState(rule, self.channels.index(rule.channel), max_intervals))
+        self._by_name = {state.rule.name: state for state in self._states}
+
+    def add_listener(self, fn):
+        self.listeners.append(fn)
+        return fn
+
+    # Names of the rules currently raised
+    @property
+    def active(self):
+        return [state.rule.name for state in self._states if state.raised]
+
+    def intervals(self, name):
+        return self._by_name[name].intervals
+
+    # Samples seen past the rule's threshold so far
+    def exceedances(self, name):
+        return self._by_name[name].exceeded
+
+    def _notify(self, alert):
+        for fn in self.listeners:
+            fn(alert)
+
+    def update(self, ts, values):
+        for state in self._states:
+            rule = state.rule
+            v = values[state.column]
+            if rule.rate:
+                last_ts, last_value = state.last_ts, state.last_value
+                state.last_ts, state.last_value = ts, v
+                # No rate for the first sample (or if the clock stepped back)
+                v = (v - last_value) * 1e9 / (ts - last_ts) if last_ts is not None and ts > last_ts else _NAN
+            if rule.above:
+                past, back = v > rule.threshold, v < rule.threshold - rule.hysteresis
+            else:
+                past, back = v < rule.threshold, v > rule.threshold + rule.hysteresis
+            if past:
+                state.exceeded += 1
+            if state.raised:
+                if back:
+                    state.raised = False
+                    state.intervals.close(ts)
+                    self._notify(Alert(rule.name, False, ts, v))
+            elif past:
+                if state.pending is None:
+                    state.pending = ts
+                if ts - state.pending >= rule.min_duration * 1e9:
+                    state.raised = True
+                    state.intervals.open(state.pending)
+                    state.pending = None
+                    self._notify(Alert(rule.name, True, ts, v))
+            else:
+                state.pending = None
+
+    # Many samples at once (timestamps ascending, columns in channel order):
+    # same result as calling update() for each, but vectorised per rule.
+    # Listeners get the raised/cleared alerts of the batch in time order
+    # (they are only built if there are listeners).
+    def extend(self, timestamps, columns):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if not len(timestamps):
+            return
+        alerts = []
+        for state in self._states:
+            values = np.asarray(columns[state.column], dtype=np.float64)
+            alerts += _evaluate(state, timestamps, values, bool(self.listeners))
+        alerts.sort(key=lambda alert: alert.timestamp)
+        for alert in alerts:
+            self._notify(alert)
+
+    def clear(self):
+        for state in self._states:
+            state.raised = False
+            state.pending = state.last_ts = state.last_value = None
+            state.exceeded = 0
+            state.intervals.clear()
+
+
+# Vectorised update() of one rule over a batch; returns its alerts (if wanted)
+def _evaluate(state, ts, values, want_alerts=True):
+    rule = state.rule
+    n = len(ts)
+    if rule.rate:
+        prev_ts = np.concatenate(([ts[0] if state.last_ts is None else state.last_ts], ts[:-1]))
+        prev_v = np.concatenate(([np.nan if state.last_value is None else state.last_value], values[:-1]))
+        dt = ts - prev_ts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            q = np.where(dt > 0, (values - prev_v) * 1e9 / np.where(dt > 0, dt, 1), np.nan)
+        state.last_ts, state.last_value = int(ts[-1]), float(values[-1])
+    else:
+        q = values
+    with np.errstate(invalid="ignore"):
+        if rule.above:
+            past, back = q > rule.threshold, q < rule.threshold - rule.hysteresis
+        else:
+            past, back = q < rule.threshold, q > rule.threshold + rule.hysteresis
+    state.exceeded += int(np.count_nonzero(past))
+    back_idx = np.flatnonzero(back)
+    alerts = []
+
+    # Raised before this batch: nothing happens until the first sample back
+    offset = 0
+    if state.raised:
+        if not len(back_idx):
+            return alerts
+        end = int(back_idx[0])
+        state.intervals.close(int(ts[end]))
+        if want_alerts:
+            alerts.append(Alert(rule.name, False, int(ts[end]), float(q[end])))
+        state.raised = False
+        state.pending = None
+        offset = end + 1
+
+    # Runs of consecutive samples past the threshold; one carried over from
+    # the previous batch started at state.pending
+    edges = np.diff(np.concatenate(([False], past[offset:], [False])).astype(np.int8))
+    run_starts = np.flatnonzero(edges == 1) + offset
+    run_ends = np.flatnonzero(edges == -1) + offset         # exclusive
+    run_t0 = ts[run_starts]
+    if state.pending is not None and len(run_starts) and run_starts[0] == 0:
+        run_t0 = run_t0.copy()
+        run_t0[0] = state.pending
+    state.pending = None
+
+    # First sample of each run past the threshold for min_duration, and the
+    # first sample back after it (n if none yet)
+    fire = np.maximum(np.searchsorted(ts, run_t0 + int(rule.min_duration * 1e9), side="left"), run_starts)
+    fired = fire < run_ends
+    starts, fire = run_t0[fired], fire[fired]
+    clear = np.append(back_idx, n)[np.searchsorted(back_idx, fire, side="right")]
+    # Runs that fired while an earlier one was still raised share its clearing sample
+    _, first = np.unique(clear, return_index=True)
+    starts, fire, clear = starts[first], fire[first], clear[first]
+
+    if len(fire):
+        state.intervals.extend(starts, np.where(clear < n, ts[np.minimum(clear, n - 1)], _OPEN))
+        if want_alerts:
+            for f, c in zip(fire.tolist(), clear.tolist()):
+                alerts.append(Alert(rule.name, True, int(ts[f]), float(q[f])))
+                if c < n:
+                    alerts.append(Alert(rule.name, False, int(ts[c]), float(q[c])))
+        state.raised = bool(clear[-1] == n)
+
+    # A run still waiting out min_duration at the end of the batch
+    if not state.raised and len(run_starts) and run_ends[-1] == n:
+        state.pending = int(run_t0[-1])
+    return alerts
+
+
+# Intervals of each rule over a historical log (see log_rotation.read_log),
+# evaluated in one pass, REPLAY_CHUNK rows at a time so memory stays bounded
+# however long the log: {rule name: (starts, ends)}
+def replay(path, rules=DEFAULT_RULES, channels=CHANNELS, t0=None, t1=None, chunk_rows=REPLAY_CHUNK):
+    engine = AlertEngine(channels, rules, max_intervals=sys.maxsize)
+    rows = read_log(path, t0, t1)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            break
+        timestamps = np.fromiter((ts for ts, _ in chunk), dtype=np.int64, count=len(chunk))
+        values = np.array([v for _, v in chunk], dtype=np.float64).reshape(len(chunk), -1)
+        engine.extend(timestamps, values.T)
+    return {name: engine.intervals(name).query() for name in engine.rules}
+
+
+def _format_ns(t):
+    return "-" if t == _OPEN else datetime.fromtimestamp(t / 1e9).isoformat()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the alert intervals in a CSV log (all segments)")
+    parser.add_argument("csv_path")
+    parser.add_argument("--rules", help="JSON list of rules (default: the firmware thresholds)")
+    parser.add_argument("--start", help="ISO timestamp, e.g. 2024-05-14T02:00")
+    parser.add_argument("--end", help="ISO timestamp, e.g. 2024-05-14T03:00")
+    args = parser.parse_args()
+    rules = load_rules(args.rules) if args.rules else DEFAULT_RULES
+    t0 = iso_to_ns(args.start) if args.start else None
+    t1 = iso_to_ns(args.end) if args.end else None
+    for name, (starts, ends) in replay(args.csv_path, rules, t0=t0, t1=t1).items():
+        print(f"{name}: {len(starts)} intervals")
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            print(f"  {_format_ns(start)} -> {_format_ns(end)}")
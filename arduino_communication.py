@@ -4,10 +4,18 @@
 # jz587 and ak2444
 
 # Import Necessary Modules
-import serial
+# (kept free of tkinter/matplotlib so the logger can run headless: python -m arduino_communication)
 import threading
-import csv
-from datetime import datetime
+import argparse
+from ring_buffer import RingBuffer, ChannelView, TimeView
+from running_stats import SensorStats
+from rollup import RollupStore
+from alerts import DEFAULT_RULES, AlertEngine, load_rules
+from acquisition import CHANNELS, Device
+from framing import PROTOCOLS
+from sample_server import DEFAULT_ADDRESS, SampleServer, SampleClient
+from metrics import DEFAULT_ADDRESS as METRICS_DEFAULT_ADDRESS, MetricsRegistry
+from profiling import profiler
 
 # Arduino Setup
 PORT      = 'COM9'
@@ -16,141 +24,149 @@ LOG_FILE  = "weather_monitoring.csv"
 MAX_POINTS = 50
 MAX_BUFFER_SIZE = 200000
 
-# Buffers for Storing Data
-temperatures = []
-humidities   = []
-pressures    = []
-luxintensities = []
-wind_speeds  = []
-time_data    = []
-
-# Create new log file everytime program is running (clearing any past data)
-with open(LOG_FILE, 'w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(["timestamp", "temp", "hum", "pres", "lux", "wind"])
-
-# function for computing checksum
-def compute_xor_checksum(s: str) -> int:
-    cs = 0
-    for ch in s:
-        cs ^= ord(ch)
-    return cs
+# Serial framing: "text" (checksummed lines), "binary" (see binary_protocol.py) or "auto"
+PROTOCOL = "auto"
+
+# Log file batching: flush every LOG_FLUSH_ROWS rows or LOG_FLUSH_INTERVAL seconds
+LOG_FLUSH_ROWS     = 50
+LOG_FLUSH_INTERVAL = 1.0
+LOG_FSYNC          = "never"   # "never", "flush" or "close"
+
+# Log rotation: a new segment every LOG_ROTATE_INTERVAL ("hourly", "daily" or
+# seconds) and/or LOG_ROTATE_BYTES; closed segments are compressed with LOG_COMPRESS
+LOG_ROTATE_INTERVAL = "daily"
+LOG_ROTATE_BYTES    = None
+LOG_COMPRESS        = "gzip"      # "gzip", "zstd" (needs the zstandard package) or None
+
+# Optional binary log written alongside the CSV (e.g. "weather_monitoring.bin")
+BINARY_LOG_FILE = None
+
+# Address the headless logger publishes samples on (GUI clients attach here)
+DAEMON_ADDRESS = DEFAULT_ADDRESS
+
+# Address the headless logger serves metrics on (Prometheus /metrics, /metrics.json)
+METRICS_ADDRESS = METRICS_DEFAULT_ADDRESS
+
+# Running statistics per channel: overall, last 100/200 samples and time windows (s)
+STATS_SAMPLE_WINDOWS = (100, 200)
+STATS_TIME_WINDOWS   = (60, 3600)
+
+# Alert rules (alerts.AlertRule): thresholds with hysteresis, minimum duration
+# and rate of change; --alerts FILE loads them from JSON
+ALERT_RULES = DEFAULT_RULES
+
+# Buffers for Storing Data (one preallocated ring buffer, one column per channel)
+def init_buffers(size):
+    global buffer, stats, rollups, alerts, temperatures, humidities, pressures, luxintensities, wind_speeds, time_data
+    buffer = RingBuffer(size, CHANNELS)
+    stats = SensorStats(CHANNELS, STATS_SAMPLE_WINDOWS, STATS_TIME_WINDOWS)
+    # 1 s / 1 min / 1 h aggregates for long-range views (rollups.query(t0, t1, max_points))
+    rollups = RollupStore(CHANNELS)
+    # Raised/cleared alerts and the intervals they were raised (alerts.intervals(rule))
+    alerts = AlertEngine(CHANNELS, ALERT_RULES)
+
+    # List-like views kept for code that reads the old per-channel lists
+    temperatures   = ChannelView(buffer, "temp")
+    humidities     = ChannelView(buffer, "hum")
+    pressures      = ChannelView(buffer, "pres")
+    luxintensities = ChannelView(buffer, "lux")
+    wind_speeds    = ChannelView(buffer, "wind")
+    time_data      = TimeView(buffer)
+
+init_buffers(MAX_BUFFER_SIZE)
+
+# Ingest health of this process: frame, error, LED and CSV counters, parse time
+# and serial read -> CSV latency histograms (see metrics.py)
+metrics = MetricsRegistry()
+
+# Publishes accepted samples to attached GUIs (only set up by the headless logger)
+server = None
+
+# The serial device owned by this process (set once the reader starts)
+device = None
 
 # thread for reading from and writing to serial
 def reader_thread():
-    # Communications protocol
-
-    # Check if Arduino port can be accessed
-    try:
-        ser = serial.Serial(PORT, BAUD_RATE, timeout=1)
-    except serial.SerialException:
-        print("Could not open", PORT)
-        return
-    
-
-    with open(LOG_FILE, 'a', newline='') as log_file:
-        csv_writer = csv.writer(log_file)
-
-        while True:
-            line = ser.readline().decode('utf-8', errors='ignore').strip()
-            # print(line)
-
-            # Check if data has been transmitted
-            if not line:
-                print("No data received from Arduino")
-                continue
-
-            # Check if checksum has been transmitted
-            if " CHK:" not in line:
-                print("Checksum not transmitted error has occured")
-                continue
-
-            payload, check_sum = line.split(" CHK:")
-            #print(payload, check_sum)
-            
-            # Check if valid checksum has been received
-            try:
-                rx_checksum = int(check_sum, 16)
-            except ValueError:
-                print("Invalid checksum")
-                # Flash LED by sending command to serial
-                sent_command = "LED_ON" + '\n'
-                ser.write(sent_command.encode('ascii'))
-                ser.flush()
-                continue
-            
-            # Recalculate checksum and compare to received checksum
-            if compute_xor_checksum(payload) != rx_checksum:
-                print("Data has been corrupted")
-                # Flash LED by sending command to serial
-                sent_command = "LED_ON" + '\n'
-                ser.write(sent_command.encode('ascii'))
-                ser.flush()
-                continue
-            
-            # Ensuring all sensor values have been transmitted
-            parts = payload.split()
-            #print(parts)
-            if len(parts) != 5:
-                print("Number of elements in line error has occured")
-                # Flash LED by sending command to serial
-                sent_command = "LED_ON" + '\n'
-                ser.write(sent_command.encode('ascii'))
-                ser.flush()
-                continue
-            
-            # Parsing payload data
-            try:
-                sensor_to_val = {}
-                for sv in parts:
-                    k, v = sv.split(':')
-                    sensor_to_val[k] = float(v)
-
-                hum  = sensor_to_val['HUM']
-                temp = sensor_to_val['T']
-                lux  = sensor_to_val['LUX']
-                pres = sensor_to_val['PRES']
-                wind = sensor_to_val['WIND']
-
-            except (KeyError, ValueError):
-                # Flash LED by sending command to serial
-                sent_command = "LED_ON" + '\n'
-                ser.write(sent_command.encode('ascii'))
-                ser.flush()
-                continue
-
-            # Obtaining time stamp
-            now = datetime.now()
-            ts = now.strftime("%H:%M:%S")
-            
-            # Clear last element if size of buffer exceeded
-            if len(temperatures) >= MAX_BUFFER_SIZE:
-                temperatures.pop(0)
-                humidities.pop(0)
-                pressures.pop(0)
-                luxintensities.pop(0)
-                wind_speeds.pop(0)
-                time_data.pop(0)
-
-            # Add latest value to buffers
-            temperatures.append(temp)
-            humidities.append(hum)
-            pressures.append(pres)
-            luxintensities.append(lux)
-            wind_speeds.append(wind)
-            time_data.append(ts)
-
-            # Write latest data to log file
-            csv_writer.writerow([
-                now.isoformat(),
-                f"{temp:.2f}",
-                f"{hum:.2f}",
-                f"{pres:.2f}",
-                f"{lux:.2f}",
-                f"{wind:.2f}"
-            ])
-            log_file.flush()
+    global device
+    device = Device(PORT, PORT, BAUD_RATE, LOG_FILE, BINARY_LOG_FILE, buffer=buffer, stats=stats, rollups=rollups,
+                    alerts=alerts,
+                    flush_rows=LOG_FLUSH_ROWS, flush_interval=LOG_FLUSH_INTERVAL, fsync=LOG_FSYNC,
+                    rotate_interval=LOG_ROTATE_INTERVAL, rotate_bytes=LOG_ROTATE_BYTES, compress=LOG_COMPRESS,
+                    protocol=PROTOCOL, metrics=metrics)
+    device.server = server
+    device.run()
 
 def start_reader():
     thread = threading.Thread(target=reader_thread, daemon=True)
     thread.start()
+    return thread
+
+# Receive samples from a running headless logger instead of opening the serial
+# port; raises OSError if no logger is listening
+def attach(host=DAEMON_ADDRESS[0], port=DAEMON_ADDRESS[1]):
+    return SampleClient(buffer, stats, host, port, rollups, alerts).start()
+
+# Start publishing accepted samples for GUI clients
+def serve(host=DAEMON_ADDRESS[0], port=DAEMON_ADDRESS[1]):
+    global server
+    server = SampleServer(buffer, host, port).start()
+    return server
+
+# Serve the metrics over HTTP
+def serve_metrics(host=METRICS_ADDRESS[0], port=METRICS_ADDRESS[1]):
+    return metrics.serve(host, port)
+
+# Headless logger: ingest, validation and logging without any GUI
+def main(argv=None):
+    global PORT, BAUD_RATE, LOG_FILE, BINARY_LOG_FILE, PROTOCOL, LOG_ROTATE_INTERVAL, LOG_ROTATE_BYTES, ALERT_RULES
+
+    parser = argparse.ArgumentParser(description="Headless weather station logger")
+    parser.add_argument("--port", default=PORT, help="serial port of the Arduino")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument("--log", default=LOG_FILE, help="CSV log file")
+    parser.add_argument("--binary-log", default=BINARY_LOG_FILE, help="optional binary log file")
+    parser.add_argument("--rotate", default=LOG_ROTATE_INTERVAL, choices=("hourly", "daily", "none"),
+                        help="start a new (compressed once closed) log segment every hour/day")
+    parser.add_argument("--rotate-mb", type=float, help="also start a new segment past this size")
+    parser.add_argument("--buffer-size", type=int, default=MAX_BUFFER_SIZE, help="samples kept in memory")
+    parser.add_argument("--alerts", metavar="FILE", help="JSON list of alert rules (default: the firmware thresholds)")
+    parser.add_argument("--protocol", choices=PROTOCOLS, default=PROTOCOL,
+                        help="serial framing: checksummed text lines, binary frames or auto-detect")
+    parser.add_argument("--listen", default="%s:%d" % DAEMON_ADDRESS,
+                        help="HOST:PORT that GUI clients attach to")
+    parser.add_argument("--no-serve", action="store_true", help="do not accept GUI clients")
+    parser.add_argument("--metrics", default="%s:%d" % METRICS_ADDRESS,
+                        help="HOST:PORT serving Prometheus metrics (/metrics) and JSON (/metrics.json)")
+    parser.add_argument("--no-metrics", action="store_true", help="do not serve metrics")
+    parser.add_argument("--profile", action="store_true",
+                        help="print per-stage timings of the reader and CSV writer periodically")
+    parser.add_argument("--profile-trace", metavar="FILE", help="write a Chrome trace of the last minute at exit")
+    args = parser.parse_args(argv)
+
+    if args.profile or args.profile_trace:
+        profiler.enable(trace_path=args.profile_trace)
+
+    PORT, BAUD_RATE, LOG_FILE, BINARY_LOG_FILE = args.port, args.baud, args.log, args.binary_log
+    PROTOCOL = args.protocol
+    LOG_ROTATE_INTERVAL = None if args.rotate == "none" else args.rotate
+    if args.rotate_mb:
+        LOG_ROTATE_BYTES = int(args.rotate_mb * 1e6)
+    if args.alerts:
+        ALERT_RULES = load_rules(args.alerts)
+    if args.buffer_size != MAX_BUFFER_SIZE or args.alerts:
+        init_buffers(args.buffer_size)
+    if not args.no_serve:
+        host, _, port = args.listen.rpartition(":")
+        serve(host or DAEMON_ADDRESS[0], int(port))
+        print("Serving samples on %s:%d" % server.address)
+    if not args.no_metrics:
+        host, _, port = args.metrics.rpartition(":")
+        print("Serving metrics on http://%s:%d/metrics" % serve_metrics(host or METRICS_ADDRESS[0], int(port)).address)
+
+    try:
+        reader_thread()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
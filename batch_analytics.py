@@ -0,0 +1,242 @@
+# batch_analytics.py
+# Daily summaries of many CSV logs at once, one file per worker process
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Usage: python batch_analytics.py LOGS... [-o summary.npz] [--jobs N]
+# LOGS may be files (plain, .gz or .zst segments) or directories searched for
+# them. Each worker streams its file in BLOCK_SIZE pieces parsed by np.loadtxt,
+# so memory per worker stays bounded however big the file, and files are
+# independent, so the run scales with the number of cores. Per file and per
+# day it keeps min/max/mean of each channel, min/max of the same moving
+# average as the GUI (MA_KIND over MA_SAMPLES), and for each alert rule the
+# samples past its threshold and the number of times it was raised.
+
+# Import Necessary Modules
+import argparse
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from alerts import DEFAULT_RULES, AlertEngine, load_rules
+from binary_log import CHANNELS
+from log_rotation import open_segment
+from smoothing import KINDS, Smoother
+
+BLOCK_SIZE = 1 << 22        # bytes parsed per step
+MA_KIND = "sma"             # as gui.py
+MA_SAMPLES = 5
+LOG_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+ROW_DTYPE = np.dtype([("timestamp", "S32"), *((ch, np.float64) for ch in CHANNELS)])
+
+
+# Rows of one block of CSV text (whole lines, no header) as (timestamps
+# datetime64[us], values of shape (n, channels), rows skipped). A block with a
+# malformed row is parsed again line by line, skipping the bad ones.
+def parse_block(data):
+    try:
+        rows = np.loadtxt(io.BytesIO(data), delimiter=",", dtype=ROW_DTYPE, ndmin=1)
+        timestamps = rows["timestamp"].astype("datetime64[us]")
+        bad = 0
+    except ValueError:
+        good = []
+        lines = [line for line in data.splitlines() if line.strip()]
+        for line in lines:
+            fields = line.split(b",")
+            if len(fields) != len(ROW_DTYPE):
+                continue
+            try:
+                np.datetime64(fields[0].decode("ascii"), "us")
+                good.append((fields[0], *map(float, fields[1:])))
+            except (ValueError, UnicodeDecodeError):
+                continue
+        rows = np.array(good, dtype=ROW_DTYPE)
+        timestamps = rows["timestamp"].astype("datetime64[us]")
+        bad = len(lines) - len(good)
+    values = np.column_stack([rows[ch] for ch in CHANNELS]) if len(rows) else np.zeros((0, len(CHANNELS)))
+    return timestamps, values, bad
+
+
+# Parsed blocks of a CSV log, oldest first (the header is skipped)
+def read_blocks(path, block_size=BLOCK_SIZE):
+    with open_segment(path) as f:
+        f.readline()
+        carry = b""
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            data = carry + data
+            end = data.rfind(b"\n") + 1
+            carry = data[end:]
+            if end:
+                yield parse_block(data[:end])
+        if carry.strip():
+            yield parse_block(carry)
+
+
+# Aggregates of one day (of one file, or merged over files)
+class DaySummary:
+    def __init__(self, n_channels, n_rules):
+        self.rows = 0
+        self.valid = np.zeros(n_channels, dtype=np.int64)     # non-NaN values per channel
+        self.sum = np.zeros(n_channels)
+        self.min = np.full(n_channels, np.nan)
+        self.max = np.full(n_channels, np.nan)
+        self.ma_min = np.full(n_channels, np.nan)
+        self.ma_max = np.full(n_channels, np.nan)
+        self.exceed = np.zeros(n_rules, dtype=np.int64)
+        self.alerts = np.zeros(n_rules, dtype=np.int64)
+
+    def add(self, values, ma):
+        self.rows += len(values)
+        finite = ~np.isnan(values)
+        self.valid += finite.sum(axis=0)
+        self.sum += np.where(finite, values, 0.0).sum(axis=0)
+        self.min = np.fmin(self.min, np.fmin.reduce(values, axis=0))
+        self.max = np.fmax(self.max, np.fmax.reduce(values, axis=0))
+        self.ma_min = np.fmin(self.ma_min, np.fmin.reduce(ma, axis=0))
+        self.ma_max = np.fmax(self.ma_max, np.fmax.reduce(ma, axis=0))
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.valid += other.valid
+        self.sum += other.sum
+        for name in ("min", "ma_min"):
+            setattr(self, name, np.fmin(getattr(self, name), getattr(other, name)))
+        for name in ("max", "ma_max"):
+            setattr(self, name, np.fmax(getattr(self, name), getattr(other, name)))
+        self.exceed += other.exceed
+        self.alerts += other.alerts
+
+    @property
+    def mean(self):
+        with np.errstate(invalid="ignore"):
+            return self.sum / self.valid
+
+
+# Summary of one log: (path, rows, rows skipped, {day: DaySummary}). Runs in a
+# worker process.
+def summarise_file(path, rules=DEFAULT_RULES, ma_kind=MA_KIND, ma_window=MA_SAMPLES, block_size=BLOCK_SIZE):
+    engine = AlertEngine(CHANNELS, rules, max_intervals=1)
+    raised = []
+    engine.add_listener(lambda alert: alert.raised and raised.append(alert.rule))
+    names = list(engine.rules)
+    smoothers = [Smoother(ma_kind, ma_window) for _ in CHANNELS]
+    days = {}
+    rows = skipped = 0
+    for timestamps, values, bad in read_blocks(path, block_size):
+        skipped += bad
+        if not len(timestamps):
+            continue
+        rows += len(timestamps)
+        ma = np.column_stack([s.extend(values[:, i]) for i, s in enumerate(smoothers)])
+        ns = timestamps.astype("datetime64[ns]").view(np.int64)
+        day = timestamps.astype("datetime64[D]")
+        cuts = np.flatnonzero(day[1:] != day[:-1]) + 1
+        for a, b in zip([0, *cuts.tolist()], [*cuts.tolist(), len(day)]):
+            summary = days.get(day[a])
+            if summary is None:
+                summary = days[day[a]] = DaySummary(len(CHANNELS), len(names))
+            summary.add(values[a:b], ma[a:b])
+            before = [engine.exceedances(name) for name in names]
+            raised.clear()
+            engine.extend(ns[a:b], values[a:b].T)
+            summary.exceed += [engine.exceedances(name) - n for name, n in zip(names, before)]
+            for name in raised:
+                summary.alerts[names.index(name)] += 1
+    return path, rows, skipped, days
+
+
+# Log files under the given files and directories
+def find_logs(paths):
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.endswith(LOG_SUFFIXES):
+                    yield os.path.join(directory, name)
+
+
+def summary_dtype(rule_names):
+    fields = [("day", "datetime64[D]"), ("rows", np.int64)]
+    for ch in CHANNELS:
+        fields += [(f"{ch}_{agg}", np.float64) for agg in ("min", "max", "mean", "ma_min", "ma_max")]
+    for name in rule_names:
+        fields += [(f"{name}_exceed", np.int64), (f"{name}_alerts", np.int64)]
+    return np.dtype(fields)
+
+
+def _record(dtype, day, summary, rule_names):
+    record = np.zeros((), dtype=dtype)
+    record["day"] = day
+    record["rows"] = summary.rows
+    for i, ch in enumerate(CHANNELS):
+        for agg, values in (("min", summary.min), ("max", summary.max), ("mean", summary.mean),
+                            ("ma_min", summary.ma_min), ("ma_max", summary.ma_max)):
+            record[f"{ch}_{agg}"] = values[i]
+    for i, name in enumerate(rule_names):
+        record[f"{name}_exceed"] = summary.exceed[i]
+        record[f"{name}_alerts"] = summary.alerts[i]
+    return record
+
+
+# Summarise every log on `jobs` processes and merge the days. Returns
+# (files, file_days, daily) structured arrays: files has path/rows/skipped,
+# file_days one row per file and day (with its index in files), daily one
+# merged row per day.
+def run(paths, rules=DEFAULT_RULES, ma_kind=MA_KIND, ma_window=MA_SAMPLES, jobs=None, block_size=BLOCK_SIZE):
+    rule_names = [rule.name for rule in rules]
+    dtype = summary_dtype(rule_names)
+    file_dtype = np.dtype([("file", np.int32)] + dtype.descr)
+    files, file_days, merged = [], [], {}
+    worker = partial(summarise_file, rules=rules, ma_kind=ma_kind, ma_window=ma_window, block_size=block_size)
+    logs = list(find_logs(paths))
+    workers = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(logs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Results arrive in order, one small summary per file
+        for index, (path, rows, skipped, days) in enumerate(pool.map(worker, logs, chunksize=chunksize)):
+            files.append((path, rows, skipped))
+            for day in sorted(days):
+                record = _record(dtype, day, days[day], rule_names)
+                file_days.append((index, *record.tolist()))
+                if day in merged:
+                    merged[day].merge(days[day])
+                else:
+                    merged[day] = days[day]
+    width = max([len(path) for path, _, _ in files] + [1])
+    files = np.array(files, dtype=[("path", f"U{width}"), ("rows", np.int64), ("skipped", np.int64)])
+    file_days = np.array(file_days, dtype=file_dtype)
+    daily = np.array([_record(dtype, day, merged[day], rule_names) for day in sorted(merged)], dtype=dtype)
+    return files, file_days, daily
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily summaries of many weather station CSV logs in parallel")
+    parser.add_argument("logs", nargs="+", help="CSV logs (.csv, .csv.gz, .csv.zst) or directories of them")
+    parser.add_argument("-o", "--output", default="summary.npz", help="compressed NumPy archive to write")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--rules", help="JSON list of alert rules (default: the firmware thresholds)")
+    parser.add_argument("--ma-kind", choices=KINDS, default=MA_KIND)
+    parser.add_argument("--ma-samples", type=int, default=MA_SAMPLES)
+    args = parser.parse_args(argv)
+
+    rules = load_rules(args.rules) if args.rules else DEFAULT_RULES
+    files, file_days, daily = run(args.logs, rules, args.ma_kind, args.ma_samples, args.jobs)
+    np.savez_compressed(args.output, files=files, file_days=file_days, daily=daily)
+    print(f"{len(files)} files, {int(files['rows'].sum())} rows ({int(files['skipped'].sum())} skipped), "
+          f"{len(daily)} days -> {args.output}")
+    for row in daily:
+        means = " ".join(f"{ch}={row[f'{ch}_mean']:.2f}" for ch in CHANNELS)
+        alerts = " ".join(f"{rule.name}={row[f'{rule.name}_alerts']}" for rule in rules)
+        print(f"{row['day']}  rows={row['rows']:<8} {means}  alerts: {alerts}")
+
+
+if __name__ == "__main__":
+    main()
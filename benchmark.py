@@ -0,0 +1,314 @@
+# benchmark.py
+# Throughput / latency benchmark of the ingest path and GUI frame time, without hardware,
+# plus a correctness check of reading time ranges across rotated log segments
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Usage: python benchmark.py [--frames N] [--rate HZ] [--seconds S] [--binary] [--startup]
+
+# Import Necessary Modules
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from acquisition import CHANNELS, Device
+from log_writer import format_row
+from ring_buffer import RingBuffer
+from simulator import SimulatedSerial
+
+# Grid steps (s) timed by bench_resample
+RESAMPLE_STEPS = (0.5, 1, 60)
+# Dashboard start-up budget (s): imports, matplotlib and the home plots drawn
+STARTUP_TARGET_S = 1.5
+# What gui.py imports before the window appears, timed in a fresh interpreter
+_STARTUP_IMPORTS = "tkinter, arduino_communication, smoothing, decimate, live_plots, ui_scheduler"
+
+
+# Ring buffer that records when each sample was appended
+class _TimedRingBuffer(RingBuffer):
+    def __init__(self, capacity, channels):
+        super().__init__(capacity, channels)
+        self.appended = []
+
+    def append(self, timestamp, values):
+        super().append(timestamp, values)
+        self.appended.append(time.perf_counter_ns())
+
+
+# Run one Device against a simulated port until `total` lines are handled
+def _run_device(sim, total, log_dir, buffer=None, formatter=None):
+    device = Device("bench", "SIM", log_file=os.path.join(log_dir, "bench.csv"),
+                    buffer=buffer, buffer_size=max(total, 1),
+                    serial_factory=lambda port, baud, timeout=1: sim)
+    if formatter is not None:
+        device.csv_formatter = formatter
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        device.start()
+        while device.samples + device.error_count < total:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        device.stop()
+    return device, elapsed
+
+
+# Lines/sec through read + validation + buffering + CSV queueing
+def bench_throughput(frames, log_dir, corrupt_rate=0.01, malformed_rate=0.01, binary=False):
+    sim = SimulatedSerial(rate=None, count=frames, timeout=0.05, corrupt_rate=corrupt_rate,
+                          malformed_rate=malformed_rate, seed=1, binary=binary)
+    device, elapsed = _run_device(sim, frames, log_dir)
+    return {"lines": frames, "seconds": elapsed, "lines_per_sec": frames / elapsed,
+            "accepted": device.samples, "rejected": device.error_count}
+
+
+def _percentiles(ns):
+    us = np.asarray(ns, dtype=np.float64) / 1e3
+    if us.size == 0:
+        return {}
+    return {"p50_us": float(np.percentile(us, 50)), "p95_us": float(np.percentile(us, 95)),
+            "p99_us": float(np.percentile(us, 99)), "max_us": float(us.max())}
+
+
+# End-to-end latency at a fixed frame rate: line handed out by the port ->
+# buffer append, and -> row formatted by the CSV writer thread
+def bench_latency(rate, seconds, log_dir, binary=False):
+    total = max(int(rate * seconds), 1)
+    sim = SimulatedSerial(rate=rate, count=total, timeout=0.05, seed=2, binary=binary)
+    sim.record_times = True
+    buffer = _TimedRingBuffer(total, CHANNELS)
+    written = []
+    lock = threading.Lock()
+
+    def timed_format(row):
+        with lock:
+            written.append(time.perf_counter_ns())
+        return format_row(row)
+
+    _run_device(sim, total, log_dir, buffer=buffer, formatter=timed_format)
+    emitted = np.asarray(sim.emitted[:total], dtype=np.int64)
+    appended = np.asarray(buffer.appended[:total], dtype=np.int64)
+    csv_done = np.asarray(written[:total], dtype=np.int64)
+    return {"rate": rate, "frames": total,
+            "to_buffer": _percentiles(appended - emitted[:len(appended)]),
+            "to_csv": _percentiles(csv_done - emitted[:len(csv_done)])}
+
+
+# Ring buffer full of plausible samples, 0.5 s apart
+def _filled_buffer(n):
+    buffer = RingBuffer(n, CHANNELS)
+    rng = np.random.default_rng(3)
+    buffer.extend(np.arange(n, dtype=np.int64) * 500_000_000,
+                  [22 + rng.normal(0, 2, n), 50 + rng.normal(0, 5, n), 1013 + rng.normal(0, 1, n),
+                   300 + rng.normal(0, 50, n), np.abs(rng.normal(0.5, 0.2, n))])
+    return buffer
+
+
+def _home_plots(buffer):
+    from alerts import AlertEngine
+    from live_plots import LivePlots
+    from smoothing import Smoother, SmoothedChannel
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    smoothed = {key: SmoothedChannel(buffer, ch, Smoother("sma", 5))
+                for key, ch in (("TEMP", "temp"), ("HUM", "hum"), ("LUX", "lux"))}
+    alerts = AlertEngine(CHANNELS)
+    alerts.extend(buffer.column("timestamp"), [buffer.column(ch) for ch in CHANNELS])
+    fig = Figure(figsize=(12, 5), dpi=100)
+    FigureCanvasAgg(fig)
+    return fig, LivePlots(fig.subplots(1, 3), buffer, smoothed, alerts, 50, 5)
+
+
+# Time per animation frame of the home plots on an off-screen Agg canvas,
+# both blitted (artists only) and as a full redraw
+def bench_gui_frames(n_frames=50, buffer_size=200000):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+    except ImportError:
+        return None
+    import logging
+    logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+
+    buffer = _filled_buffer(buffer_size)
+    n = buffer_size
+    fig, plots = _home_plots(buffer)
+    fig.canvas.draw()
+
+    blit, full = [], []
+    for i in range(n_frames):
+        buffer.append((n + i) * 500_000_000, (22.0, 50.0, 1013.0, 300.0, 0.5))
+        t0 = time.perf_counter_ns()
+        for artist in plots.update(i):
+            artist.axes.draw_artist(artist)
+        t1 = time.perf_counter_ns()
+        fig.canvas.draw()
+        t2 = time.perf_counter_ns()
+        blit.append(t1 - t0)
+        full.append(t2 - t1)
+    return {"frames": n_frames, "blit": _percentiles(blit), "full_redraw": _percentiles(full)}
+
+
+# Start-up phases of the dashboard (ns), run in a fresh interpreter by
+# bench_startup: matplotlib, the home plots and each detail page as gui.py
+# builds them (a 12x6 in, 200 dpi figure of three plots), drawn off-screen
+def _startup_phases(imports_ns, buffer_size=20000):
+    phases = {"imports": imports_ns}
+    t0 = time.perf_counter_ns()
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    t1 = time.perf_counter_ns()
+    phases["matplotlib"] = t1 - t0
+
+    buffer = _filled_buffer(buffer_size)
+    t1 = time.perf_counter_ns()
+    fig, _ = _home_plots(buffer)
+    fig.canvas.draw()
+    t2 = time.perf_counter_ns()
+    phases["home_plots"] = t2 - t1
+
+    ts = buffer.column("timestamp")
+    for i, ch in enumerate(CHANNELS):
+        t2 = time.perf_counter_ns()
+        fig = Figure(figsize=(12, 6), dpi=200, facecolor="#1e1e2e")
+        FigureCanvasAgg(fig)
+        for k, n in enumerate((len(ts), 100, 200)):
+            ax = fig.add_subplot(311 + k)
+            ax.plot(ts[-n:], buffer.column(ch)[-n:], linewidth=1.5)
+            ax.grid(True, linestyle="--", alpha=0.3)
+        fig.tight_layout(pad=0, h_pad=0)
+        fig.canvas.draw()
+        phases[f"page_{i}"] = time.perf_counter_ns() - t2
+    print(json.dumps(phases))
+
+
+# Time to a usable dashboard in a fresh interpreter, building every detail page
+# up front (eager) against building them on first navigation (lazy). Tk itself
+# is left out (no display needed); the window shows once the imports are done.
+def bench_startup(target_s=STARTUP_TARGET_S):
+    try:
+        import matplotlib   # noqa: F401
+    except ImportError:
+        return None
+    code = (f"import time; t0 = time.perf_counter_ns(); import {_STARTUP_IMPORTS}; "
+            f"t1 = time.perf_counter_ns(); import benchmark; benchmark._startup_phases(t1 - t0)")
+    start = time.perf_counter_ns()
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    wall = time.perf_counter_ns() - start
+    phases = json.loads(out.strip().splitlines()[-1])
+    pages = sum(v for k, v in phases.items() if k.startswith("page_"))
+    interpreter = wall - sum(phases.values())
+    lazy = interpreter + phases["imports"] + phases["matplotlib"] + phases["home_plots"]
+    return {"interpreter_ms": interpreter / 1e6, "imports_ms": phases["imports"] / 1e6,
+            "matplotlib_ms": phases["matplotlib"] / 1e6, "home_plots_ms": phases["home_plots"] / 1e6,
+            "page_ms": pages / 1e6 / (len(phases) - 3),
+            "window_ms": (interpreter + phases["imports"]) / 1e6,
+            "eager_ms": (lazy + pages) / 1e6, "lazy_ms": lazy / 1e6,
+            "target_ms": target_s * 1e3, "pass": lazy <= target_s * 1e9}
+
+
+# Time to resample a full buffer onto each grid (mean per bin, empty bins filled)
+def bench_resample(buffer_size=200000, repeats=5):
+    from resample import resample_buffer
+
+    buffer = _filled_buffer(buffer_size)
+    result = {}
+    for step in RESAMPLE_STEPS:
+        start = time.perf_counter_ns()
+        for _ in range(repeats):
+            resample_buffer(buffer, step, fill="linear")
+        result[f"step_{step}s_ms"] = (time.perf_counter_ns() - start) / repeats / 1e6
+    result["samples"] = buffer_size
+    return result
+
+
+# Correctness check of log_rotation.read_log over size-rotated segments, many
+# of which start in the same second: every time range read through the
+# segments must return exactly the rows of the whole log within it
+def check_segment_ranges(log_dir, rows=20000, max_bytes=40000, span=101):
+    from acquisition import CSV_HEADER
+    from datetime import datetime, timedelta
+    from log_rotation import LogRotation, list_segments, read_log
+    from log_writer import BatchedCSVWriter, open_csv_log
+
+    path = os.path.join(log_dir, "segments.csv")
+    open_csv_log(path, CSV_HEADER)
+    rotation = LogRotation(path, CSV_HEADER, max_bytes=max_bytes)
+    writer = BatchedCSVWriter(path, flush_rows=50, rotation=rotation).start()
+    t = datetime(2024, 5, 14, 2, 0, 0)
+    for i in range(rows):
+        writer.write((t + timedelta(milliseconds=i), 20.0, 50.0, 1013.0, 300.0, float(i % 7)))
+        # Let each batch be flushed (and rotated) before queueing the next
+        while (i + 1) % 100 == 0 and writer.rows_written < i + 1:
+            time.sleep(0.0005)
+    writer.close()
+    rotation.close(wait=True)
+
+    everything = list(read_log(path))
+    timestamps = [ts for ts, _ in everything]
+    checked = failed = 0
+    for start in range(0, len(everything) - span, max(len(everything) // 50, 1)):
+        t0, t1 = timestamps[start], timestamps[start + span - 1]
+        checked += 1
+        if list(read_log(path, t0, t1)) != [row for row in everything if t0 <= row[0] <= t1]:
+            failed += 1
+    return {"rows": len(everything), "segments": len(list_segments(path)) + 1, "ranges": checked,
+            "failed": failed, "pass": len(everything) == rows and not failed}
+
+
+def _format(name, result):
+    if result is None:
+        return f"{name}: skipped (matplotlib not installed)"
+    parts = []
+    for k, v in result.items():
+        if isinstance(v, dict):
+            parts.append(k + " [" + ", ".join(f"{kk}={vv:.1f}" for kk, vv in v.items()) + "]")
+        elif isinstance(v, float):
+            parts.append(f"{k}={v:.1f}")
+        else:
+            parts.append(f"{k}={v}")
+    return f"{name}: " + " ".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ingest path and GUI frame time without hardware")
+    parser.add_argument("--frames", type=int, default=20000, help="lines for the throughput run")
+    parser.add_argument("--rate", type=float, default=200.0, help="frames/sec for the latency run")
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of the latency run")
+    parser.add_argument("--no-gui", action="store_true", help="skip the GUI frame time benchmark")
+    parser.add_argument("--binary", action="store_true", help="simulate the binary frame protocol")
+    parser.add_argument("--startup", action="store_true",
+                        help=f"also time dashboard start-up against the {STARTUP_TARGET_S} s target")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        print(_format("throughput", bench_throughput(args.frames, log_dir, binary=args.binary)))
+        print(_format("latency", bench_latency(args.rate, args.seconds, log_dir, binary=args.binary)))
+        segments = check_segment_ranges(log_dir)
+        print(_format("segments", segments))
+    print(_format("resample", bench_resample()))
+    if not args.no_gui:
+        print(_format("gui_frame", bench_gui_frames()))
+    if args.startup:
+        result = bench_startup()
+        print(_format("startup", result))
+        if result is not None and not result["pass"]:
+            sys.exit(1)
+    if not segments["pass"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# binary_log.py
+# Append-only binary columnar log with a memory-mapped reader
+# SF4: Data Logger
+# jz587 and ak2444
+
+# File layout: a 16 byte header followed by fixed-width little-endian records
+#   header : magic "SF4B" | u16 version | u16 record size | u16 channel count | 6 reserved bytes
+#   record : i8 timestamp (epoch ns) | f4 temp | f4 hum | f4 pres | f4 lux | f4 wind
+
+# Import Necessary Modules
+import argparse
+import csv
+import os
+import struct
+from datetime import datetime
+
+import numpy as np
+
+MAGIC = b"SF4B"
+VERSION = 1
+CHANNELS = ("temp", "hum", "pres", "lux", "wind")
+RECORD_DTYPE = np.dtype([("timestamp", "<i8")] + [(name, "<f4") for name in CHANNELS])
+RECORD_STRUCT = struct.Struct("<q" + "f" * len(CHANNELS))
+HEADER_STRUCT = struct.Struct("<4sHHH6x")
+HEADER_SIZE = HEADER_STRUCT.size
+
+
+def header_bytes():
+    return HEADER_STRUCT.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, len(CHANNELS))
+
+
+# Raise ValueError if a header was not written by this module
+def check_header(raw, path):
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{path}: truncated header")
+    magic, version, record_size, n_channels = HEADER_STRUCT.unpack(raw[:HEADER_SIZE])
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not an SF4 binary log (version {VERSION})")
+    if record_size != RECORD_DTYPE.itemsize or n_channels != len(CHANNELS):
+        raise ValueError(f"{path}: unexpected record layout")
+
+
+# Appends records to a binary log, writing the header if the file is new. A
+# record left partly written by a crash is cut off first, so that new records
+# stay aligned.
+class BinaryLogWriter:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'ab')
+        size = self._file.tell()
+        if size == 0:
+            self._file.write(header_bytes())
+        else:
+            with open(path, 'rb') as f:
+                check_header(f.read(HEADER_SIZE), path)
+            torn = (size - HEADER_SIZE) % RECORD_DTYPE.itemsize
+            if torn:
+                self._file.truncate(size - torn)
+
+    def append(self, timestamp, values):
+        self._file.write(RECORD_STRUCT.pack(timestamp, *values))
+
+    # Append many records at once from a structured array of RECORD_DTYPE
+    def append_records(self, records):
+        self._file.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+# Memory-map a whole binary log as a structured array (fields: timestamp + channels);
+# a partially written trailing record is ignored
+def open_binary_log(path):
+    with open(path, 'rb') as f:
+        check_header(f.read(HEADER_SIZE), path)
+    n_records = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if n_records == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+
+
+# Convert an ISO timestamp from the CSV log to epoch nanoseconds (exact to the
+# microsecond: whole seconds and microseconds are converted separately)
+def iso_to_ns(text):
+    dt = datetime.fromisoformat(text)
+    return (int(dt.replace(microsecond=0).timestamp()) * 1_000_000 + dt.microsecond) * 1000
+
+
+# Convert a CSV log (timestamp,temp,hum,pres,lux,wind) into a binary log;
+# returns (records written, malformed rows skipped)
+def csv_to_binary(csv_path, bin_path, chunk_rows=65536):
+    writer = BinaryLogWriter(bin_path)
+    total = skipped = 0
+    try:
+        with open(csv_path, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return 0, 0
+            if [h.strip() for h in header] != ["timestamp", *CHANNELS]:
+                raise ValueError(f"{csv_path}: unexpected header {header}")
+
+            chunk = np.zeros(chunk_rows, dtype=RECORD_DTYPE)
+            n = 0
+            for row in reader:
+                if len(row) != len(CHANNELS) + 1:
+                    skipped += 1
+                    continue
+                try:
+                    chunk[n] = (iso_to_ns(row[0]), *map(float, row[1:]))
+                except ValueError:
+                    skipped += 1
+                    continue
+                n += 1
+                if n == chunk_rows:
+                    writer.append_records(chunk)
+                    total += n
+                    n = 0
+            writer.append_records(chunk[:n])
+            total += n
+    finally:
+        writer.close()
+    return total, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a weather_monitoring CSV log to the binary log format")
+    parser.add_argument("csv_path")
+    parser.add_argument("bin_path")
+    args = parser.parse_args()
+    total, skipped = csv_to_binary(args.csv_path, args.bin_path)
+    print(f"Converted {total} records ({skipped} malformed rows skipped)")
@@ -0,0 +1,112 @@
+# binary_protocol.py
+# Compact binary frames between final_firmware.ino and the PC reader
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Frame layout (20 bytes, little-endian), opt-in on the firmware side:
+#   A5 5A | u16 seq | i16 hum*10 | i16 temp*10 | i32 lux*10 | i32 pres*100 | i16 wind*1000 | u16 CRC
+# The CRC is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over seq..wind.
+# Sync bytes are never valid ASCII, so they cannot be confused with the text protocol.
+
+# Import Necessary Modules
+import binascii
+import struct
+
+from frame_parser import ParseError, Sample
+
+SYNC = b"\xA5\x5A"
+BODY_STRUCT = struct.Struct("<HhhiihH")      # seq, fields..., crc
+FRAME_SIZE = len(SYNC) + BODY_STRUCT.size
+SCALES = {"hum": 10, "temp": 10, "lux": 10, "pres": 100, "wind": 1000}
+
+
+# CRC-16/CCITT-FALSE (binascii's CRC-CCITT started from 0xFFFF; check value 0x29B1)
+def crc16(data: bytes, crc=0xFFFF) -> int:
+    return binascii.crc_hqx(data, crc)
+
+
+# Build one frame (used by the simulator; the firmware does the same in C)
+def encode_frame(seq, sample):
+    body = BODY_STRUCT.pack(
+        seq & 0xFFFF,
+        round(sample.hum * SCALES["hum"]),
+        round(sample.temp * SCALES["temp"]),
+        round(sample.lux * SCALES["lux"]),
+        round(sample.pres * SCALES["pres"]),
+        round(sample.wind * SCALES["wind"]),
+        0,
+    )[:-2]
+    return SYNC + body + struct.pack("<H", crc16(body))
+
+
+# Offset of the first complete frame in buf whose CRC checks out, or -1
+def find_frame(buf, start=0):
+    while True:
+        i = buf.find(SYNC, start)
+        if i < 0 or len(buf) - i < FRAME_SIZE:
+            return -1
+        end = i + FRAME_SIZE
+        if crc16(buf[i + 2:end - 2]) == int.from_bytes(buf[end - 2:end], "little"):
+            return i
+        start = i + 1
+
+
+# Splits a byte stream into binary frames: scans for the sync bytes, checks the
+# CRC and slides forward one byte on failure. Tracks sequence gaps to count
+# dropped frames.
+class BinaryFramer:
+    def __init__(self):
+        self.bytes = 0
+        self.frames = 0
+        self.resyncs = 0
+        self.crc_errors = 0
+        self.dropped = 0
+        self.last_seq = None
+        self._buf = bytearray()
+
+    # Returns (ParseError, Sample or None) for every frame found
+    def feed(self, data):
+        self.bytes += len(data)
+        buf = self._buf
+        buf += data
+        out = []
+        pos = 0
+        while True:
+            start = buf.find(SYNC, pos)
+            if start < 0:
+                # Keep a trailing first sync byte, drop anything else
+                keep = len(buf) - 1 if buf.endswith(SYNC[:1]) else len(buf)
+                if keep > pos:
+                    self.resyncs += 1
+                pos = keep
+                break
+            if start > pos:
+                self.resyncs += 1
+            if len(buf) - start < FRAME_SIZE:
+                pos = start
+                break
+            body = bytes(buf[start + 2:start + FRAME_SIZE - 2])
+            seq, hum, temp, lux, pres, wind, crc = BODY_STRUCT.unpack_from(buf, start + 2)
+            if crc16(body) != crc:
+                self.crc_errors += 1
+                out.append((ParseError.CORRUPTED, None))
+                pos = start + 1
+                continue
+            if self.last_seq is not None:
+                gap = (seq - self.last_seq - 1) & 0xFFFF
+                # A huge gap means the device restarted, not lost frames
+                if gap < 0x8000:
+                    self.dropped += gap
+            self.last_seq = seq
+            self.frames += 1
+            out.append((ParseError.OK, Sample(
+                temp / SCALES["temp"], hum / SCALES["hum"], pres / SCALES["pres"],
+                lux / SCALES["lux"], wind / SCALES["wind"],
+            )))
+            pos = start + FRAME_SIZE
+        del buf[:pos]
+        return out
+
+    def reset(self):
+        self._buf.clear()
+        self.last_seq = None
@@ -0,0 +1,96 @@
+# decimate.py
+# Peak-preserving downsampling of long series for plotting
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+import numpy as np
+
+METHODS = ("minmax", "lttb")
+
+
+# Min/max envelope: split the series into n_out / 2 equal buckets and keep the
+# lowest and highest sample of each, in order. Returns the kept indices.
+def minmax_indices(y, n_out):
+    y = np.asarray(y)
+    n = y.size
+    n_buckets = max(int(n_out) // 2, 1)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.empty(n_buckets * size, dtype=y.dtype)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    rows = padded.reshape(n_buckets, size)
+    base = np.arange(n_buckets) * size
+    lo = base + rows.argmin(axis=1)
+    hi = base + rows.argmax(axis=1)
+    idx = np.sort(np.stack((lo, hi), axis=1), axis=1).ravel()
+    idx = np.minimum(idx, n - 1)
+    # Drop the duplicate produced when min and max are the same sample
+    keep = np.ones(idx.size, dtype=bool)
+    keep[1:] = idx[1:] != idx[:-1]
+    return idx[keep]
+
+
+# Largest-Triangle-Three-Buckets: keep the first and last sample plus, from each
+# bucket in between, the sample forming the largest triangle with the previously
+# kept sample and the mean of the next bucket. Returns the kept indices.
+def lttb_indices(y, n_out):
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    n_out = int(n_out)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    prev = 0
+    for b in range(n_out - 2):
+        start, stop = edges[b], edges[b + 1]
+        nxt_start, nxt_stop = stop, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[nxt_start:nxt_stop].mean()
+        avg_y = y[nxt_start:nxt_stop].mean()
+        area = np.abs((x[prev] - avg_x) * (y[start:stop] - y[prev])
+                      - (x[prev] - x[start:stop]) * (avg_y - y[prev]))
+        prev = start + int(area.argmax())
+        idx[b + 1] = prev
+    return idx
+
+
+# Downsample a series to about n_out points: returns (sample indices, values)
+def decimate(y, n_out, method="minmax"):
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    y = np.asarray(y)
+    idx = minmax_indices(y, n_out) if method == "minmax" else lttb_indices(y, n_out)
+    return idx, y[idx]
+
+
+# Decimated ring buffer channels, cached per channel and reused until new
+# samples are appended (or a different point budget is asked for)
+class DecimationCache:
+    def __init__(self, ring, method="minmax"):
+        self.ring = ring
+        self.method = method
+        self._cache = {}    # channel -> (count, n_out, indices, values)
+
+    def get(self, name, n_out):
+        count = self.ring.count
+        n_out = int(n_out)
+        hit = self._cache.get(name)
+        if hit is not None and hit[0] == count and hit[1] == n_out:
+            return hit[2], hit[3]
+        idx, values = decimate(self.ring.column(name, count=count), n_out, self.method)
+        self._cache[name] = (count, n_out, idx, values)
+
+        return idx, values
+
+    def invalidate(self, name=None):
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name, None)
@@ -30,7 +30,125 @@ DFRobot_BMP388_I2C bmp388;
 // Wind Sensor
 #define WIND_PIN  A3
 
-// Arduino Setup
+// Serial link (must match BAUD_RATE / --baud on the PC side; the reader
+// handles rates well above 9600, e.g. 115200)
+#define SERIAL_BAUD 9600
+
+// Serial protocol: 0 = checksummed text lines, 1 = compact 20-byte binary frames
+// (see binary_protocol.py; the PC reader detects either automatically)
+#define BINARY_PROTOCOL 0
+
+// LED alert thresholds, with hysteresis so the LEDs do not flicker around them
+// (keep in step with DEFAULT_RULES in alerts.py)
+#define TEMP_ALERT_C      26.0   // red LED above
+#define TEMP_ALERT_HYST   0.5
+#define LUX_ALERT_LUX     100.0  // green LED below
+#define LUX_ALERT_HYST    10.0
+
+#if BINARY_PROTOCOL
+uint16_t frameSeq = 0;   // lets the PC count dropped frames
+
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)
+uint16_t crc16(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Fixed-point value clamped to the field's range
+int32_t fixedPoint(float v, float scale, int32_t lo, int32_t hi) {
+  float x = v * scale;
+  if (!(x > lo)) return lo;   // also catches NaN
+  if (x > hi) return hi;
+  return lround(x);
+}
+
+// Little-endian field writers
+void putU16(uint8_t *buf, uint16_t v) {
+  buf[0] = v & 0xFF;
+  buf[1] = v >> 8;
+}
+
+void putU32(uint8_t *buf, uint32_t v) {
+  for (uint8_t i = 0; i < 4; i++) {
+    buf[i] = (v >> (8 * i)) & 0xFF;
+  }
+}
+
+// A5 5A | seq | hum*10 | temp*10 | lux*10 | pres*100 | wind*1000 | CRC over seq..wind
+void sendBinaryFrame(float h, float t, float lux, float p, float windV) {
+  uint8_t frame[20];
+  frame[0] = 0xA5;
+  frame[1] = 0x5A;
+  putU16(frame + 2, frameSeq++);
+  putU16(frame + 4, fixedPoint(h, 10, -32768, 32767));
+  putU16(frame + 6, fixedPoint(t, 10, -32768, 32767));
+  putU32(frame + 8, fixedPoint(lux, 10, -2000000000L, 2000000000L));
+  putU32(frame + 12, fixedPoint(p, 100, -2000000000L, 2000000000L));
+  putU16(frame + 16, fixedPoint(windV, 1000, -32768, 32767));
+  putU16(frame + 18, crc16(frame + 2, 16));
+  Serial.write(frame, sizeof(frame));
+}
+#endif
+
+// Scheduler: each task runs on its own period instead of one delay()-paced loop
+#define DHT_PERIOD_MS     2000   // DHT11 must not be read more than once a second
+#define BMP_PERIOD_MS     100
+#define ANALOG_PERIOD_MS  20     // 50 Hz light/wind sampling, averaged per report
+#define REPORT_PERIOD_MS  500    // one frame to the PC per period
+
+unsigned long lastDht = 0;
+unsigned long lastBmp = 0;
+unsigned long lastAnalog = 0;
+unsigned long lastReport = 0;
+
+// Latest slow readings (NaN until the first successful read)
+float h = NAN;
+float t = NAN;
+float p = NAN;
+
+// LED alert states
+bool tempAlert = false;
+bool luxAlert = false;
+
+// Analog samples accumulated since the last report
+uint32_t lightSum = 0;
+uint32_t windSum = 0;
+uint16_t analogCount = 0;
+
+// Partial command line from the PC
+char cmdBuf[16];
+uint8_t cmdLen = 0;
+
+// True once `period` ms have passed since `last` (millis() rollover safe).
+// Advances `last` by whole periods to keep the cadence, unless far behind.
+bool due(unsigned long &last, unsigned long period, unsigned long now) {
+  if (now - last < period) return false;
+  last += period;
+  if (now - last >= period) last = now;
+  return true;
+}
+
+void readDht() {
+  h = dht.readHumidity();
+  t = dht.readTemperature();
+}
+
+void readBmp() {
+  p = bmp388.readPressPa() / 100.0;
+}
+
+void sampleAnalog() {
+  lightSum += analogRead(LDR_PIN);
+  windSum += analogRead(WIND_PIN);
+  analogCount++;
+}
+
 void setup() {
   pinMode(LED_PIN2, OUTPUT);
   pinMode(LED_PIN3, OUTPUT);
@@ -45,64 +163,90 @@ void setup() {
   dht.begin();
   bmp388.begin();
 
-  Serial.begin(9600); // Setting Baud Rate to 9600
+  Serial.begin(SERIAL_BAUD); // Setting Baud Rate
+
+  // First readings right away so the first report has data
+  readDht();
+  readBmp();
+  sampleAnalog();
+  lastDht = lastBmp = lastAnalog = lastReport = millis();
 }
 
-void loop() {
-  // Read and process sensor values
+// 2-way communication between PC and Arduino (receiving commands from PC upon failed checksum).
+// Bytes are consumed as they arrive, so a command takes effect within one loop pass.
+void handleCommand(const char *cmd) {
+  if (strcmp(cmd, "LED_ON") == 0) {
+    digitalWrite(LED_PIN4, HIGH);
+  }
+  else if (strcmp(cmd, "LED_OFF") == 0) {
+    digitalWrite(LED_PIN4, LOW);
+  }
+}
 
-  // Temp and Humidity
-  float h = dht.readHumidity();
-  float t = dht.readTemperature();
+void serviceCommands() {
+  while (Serial.available()) {
+    char c = Serial.read();
+    if (c == '\n' || c == '\r') {
+      cmdBuf[cmdLen] = '\0';
+      if (cmdLen > 0) handleCommand(cmdBuf);
+      cmdLen = 0;
+    }
+    else if (cmdLen < sizeof(cmdBuf) - 1) {
+      cmdBuf[cmdLen++] = c;
+    }
+  }
+}
+
+// Average the analog samples, update the LEDs and send one frame
+void report() {
   if (isnan(h) || isnan(t)) {
+#if !BINARY_PROTOCOL
     Serial.println("ERR");
-    delay(500);
+#endif
+    lightSum = 0;
+    windSum = 0;
+    analogCount = 0;
     return;
   }
+  if (analogCount == 0) sampleAnalog();
 
-  // Light Intensity 
-  int rawL = analogRead(LDR_PIN);
+  // Light Intensity
+  float rawL = (float)lightSum / analogCount;
   float vL  = rawL * (5.0 / 1023.0);
   float r   = (vL / (5.0 - vL)) * 8.3;
   float lux = 732.5 * pow(r, -0.6592);
 
-  // Pressure
-  float p = bmp388.readPressPa() / 100.0;
-
   // Wind Speed
-  int rawW = analogRead(WIND_PIN);
+  float rawW = (float)windSum / analogCount;
   float windV = rawW * (5.0 / 1023.0);
 
+  lightSum = 0;
+  windSum = 0;
+  analogCount = 0;
+
   // Writing to LEDs upon breach of threshold values
 
-  // Temp crosses 26 degrees
-  if (t > 26.0) {
-    digitalWrite(LED_PIN2, HIGH);
+  // Temp crosses TEMP_ALERT_C, cleared once TEMP_ALERT_HYST below it
+  if (t > TEMP_ALERT_C) {
+    tempAlert = true;
   }
-  else{
-    digitalWrite(LED_PIN2, LOW);
+  else if (t < TEMP_ALERT_C - TEMP_ALERT_HYST) {
+    tempAlert = false;
   }
+  digitalWrite(LED_PIN2, tempAlert ? HIGH : LOW);
 
-  // Light Intensity falls below 100 lux
-  if (lux < 100.0) {
-    digitalWrite(LED_PIN3, HIGH);
-  }
-  else{
-    digitalWrite(LED_PIN3, LOW);
+  // Light Intensity falls below LUX_ALERT_LUX, cleared once LUX_ALERT_HYST above it
+  if (lux < LUX_ALERT_LUX) {
+    luxAlert = true;
   }
-
-  // 2-way communication between PC and Arduino (receiving commands from PC upon failed checksum)
-  if (Serial.available()) {
-    String cmd = Serial.readStringUntil('\n');
-    cmd.trim();
-    if (cmd == "LED_ON") {
-      digitalWrite(LED_PIN4, HIGH);
-    }
-    else if (cmd == "LED_OFF") {
-      digitalWrite(LED_PIN4, LOW);
-    }
+  else if (lux > LUX_ALERT_LUX + LUX_ALERT_HYST) {
+    luxAlert = false;
   }
+  digitalWrite(LED_PIN3, luxAlert ? HIGH : LOW);
 
+#if BINARY_PROTOCOL
+  sendBinaryFrame(h, t, lux, p, windV);
+#else
   // Compute XOR Checksum - part of communication protocol
   String payload = "HUM:"   + String(h,1)
                  + " T:"    + String(t,1)
@@ -120,6 +264,17 @@ void loop() {
   Serial.print(" CHK:");
   if (checksum < 16) Serial.print('0');     
   Serial.println(checksum, HEX);
+#endif
+}
+
+// Never blocks: each pass services commands and runs whichever tasks are due
+void loop() {
+  unsigned long now = millis();
+
+  serviceCommands();
 
-  delay(500);  // 0.5s delay
+  if (due(lastAnalog, ANALOG_PERIOD_MS, now)) sampleAnalog();
+  if (due(lastBmp, BMP_PERIOD_MS, now)) readBmp();
+  if (due(lastDht, DHT_PERIOD_MS, now)) readDht();
+  if (due(lastReport, REPORT_PERIOD_MS, now)) report();
 }
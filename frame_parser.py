@@ -0,0 +1,141 @@
+# frame_parser.py
+# Bytes-level parser for the sensor line protocol
+# SF4: Data Logger
+# jz587 and ak2444
+
+# A frame is one line: "HUM:<h> T:<t> LUX:<l> PRES:<p> WIND:<w> CHK:<XX>" where
+# XX is the hex XOR of every payload byte before " CHK:".
+
+# Import Necessary Modules
+import re
+from enum import IntEnum
+from typing import NamedTuple
+
+import numpy as np
+
+
+# Outcome of parsing one line (names match the Device error counters)
+class ParseError(IntEnum):
+    OK = 0
+    NO_DATA = 1
+    MISSING_CHECKSUM = 2
+    INVALID_CHECKSUM = 3
+    CORRUPTED = 4
+    WRONG_FIELD_COUNT = 5
+    PARSE_ERROR = 6
+
+
+# One validated sample, in channel order (temp, hum, pres, lux, wind)
+class Sample(NamedTuple):
+    temp: float
+    hum: float
+    pres: float
+    lux: float
+    wind: float
+
+
+SAMPLE_DTYPE = np.dtype([(name, np.float64) for name in Sample._fields])
+
+_NUM = rb"(\S+)"       # validated by float()
+# Fast path: the exact field order final_firmware.ino sends
+FRAME_RE = re.compile(
+    rb"HUM:" + _NUM + rb" T:" + _NUM + rb" LUX:" + _NUM + rb" PRES:" + _NUM + rb" WIND:" + _NUM
+    + rb" CHK:([0-9A-Fa-f]{1,2})"
+)
+# Same, for a raw line that may still carry its line ending
+_LINE_RE = re.compile(FRAME_RE.pattern + rb"\s*")
+_KEYS = {b"HUM": "hum", b"T": "temp", b"LUX": "lux", b"PRES": "pres", b"WIND": "wind"}
+
+
+# XOR of all bytes: the buffer is read as one integer and folded onto itself
+# (halving the width each step) instead of looping over the bytes in Python
+def xor_checksum(data: bytes) -> int:
+    x = int.from_bytes(data, 'little')
+    shift = 1 << (8 * len(data) - 1).bit_length() if data else 8
+    while shift > 8:
+        shift >>= 1
+        x ^= x >> shift
+    return x & 0xFF
+
+
+# Slow path: classify a line that is not a well-formed frame, field order free
+def _parse_slow(line):
+    if b" CHK:" not in line:
+        return ParseError.MISSING_CHECKSUM, None
+    payload, _, check_sum = line.rpartition(b" CHK:")
+    try:
+        rx_checksum = int(check_sum, 16)
+    except ValueError:
+        return ParseError.INVALID_CHECKSUM, None
+    if xor_checksum(payload) != rx_checksum:
+        return ParseError.CORRUPTED, None
+    parts = payload.split()
+    if len(parts) != 5:
+        return ParseError.WRONG_FIELD_COUNT, None
+    try:
+        values = {}
+        for sv in parts:
+            k, v = sv.split(b":")
+            values[_KEYS[k]] = float(v)
+        return ParseError.OK, Sample(values["temp"], values["hum"], values["pres"], values["lux"], values["wind"])
+    except (KeyError, ValueError):
+        return ParseError.PARSE_ERROR, None
+
+
+# Parse one line (with or without its line ending): (ParseError, Sample or None)
+def parse_line(line: bytes):
+    line = line.strip()
+    if not line:
+        return ParseError.NO_DATA, None
+    m = FRAME_RE.fullmatch(line)
+    if m is None:
+        return _parse_slow(line)
+    hum, temp, lux, pres, wind, chk = m.groups()
+    if xor_checksum(line[:m.start(6) - 5]) != int(chk, 16):
+        return ParseError.CORRUPTED, None
+    try:
+        return ParseError.OK, Sample(float(temp), float(hum), float(pres), float(lux), float(wind))
+    except ValueError:
+        return ParseError.PARSE_ERROR, None
+
+
+# Parse every line in a chunk of bytes in one call: (records, errors).
+# records is a structured array of SAMPLE_DTYPE (one row per valid frame, in
+# order), errors a list of (ParseError, line). Blank lines are skipped; a
+# trailing partial line is parsed too, so split off partial frames beforehand.
+# Checksums come from one cumulative XOR over the whole chunk.
+def parse_chunk(data: bytes):
+    data = bytes(data)
+    rows = []
+    errors = []
+    if not data:
+        return np.zeros(0, dtype=SAMPLE_DTYPE), errors
+    cx = np.bitwise_xor.accumulate(np.frombuffer(data, dtype=np.uint8)).tobytes()
+    fullmatch = _LINE_RE.fullmatch
+    append = rows.append
+    pos = 0
+    for line in data.split(b"\n"):
+        start = pos
+        pos += len(line) + 1
+        m = fullmatch(line)
+        if m is not None:
+            hum, temp, lux, pres, wind, chk = m.groups()
+            last = start + m.start(6) - 6       # last payload byte
+            checksum = cx[last] ^ cx[start - 1] if start else cx[last]
+            if checksum != int(chk, 16):
+                errors.append((ParseError.CORRUPTED, line.strip()))
+                continue
+            try:
+                append((float(temp), float(hum), float(pres), float(lux), float(wind)))
+            except ValueError:
+                errors.append((ParseError.PARSE_ERROR, line.strip()))
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        code, sample = _parse_slow(line)
+        if sample is not None:
+            append(sample)
+        else:
+            errors.append((code, line))
+    return np.array(rows, dtype=SAMPLE_DTYPE), errors
@@ -0,0 +1,166 @@
+# framing.py
+# Chunked serial reads split into frames incrementally
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+import time
+
+from binary_protocol import BinaryFramer, find_frame
+from frame_parser import parse_line
+from profiling import profiler
+
+MAX_FRAME_SIZE = 256      # longest line accepted before the framer resynchronises
+BLOCK_SIZE = 4096         # largest single read from the port
+PROTOCOLS = ("auto", "text", "binary")
+DETECT_MISSES = 8         # consecutive bad frames before "auto" detects the mode again
+DETECT_BYTES = 1024       # bytes without a good frame before "auto" detects the mode again
+
+
+# Splits a byte stream into newline-terminated frames. A partial trailing frame
+# is carried over to the next feed(); a partial frame that grows beyond
+# max_frame bytes is dropped (a resync) so line noise cannot grow the buffer.
+class LineFramer:
+    def __init__(self, max_frame=MAX_FRAME_SIZE):
+        self.max_frame = max_frame
+        self.bytes = 0
+        self.frames = 0
+        self.resyncs = 0
+        self._partial = bytearray()
+
+    # Returns the complete (non-empty) lines, without their line endings
+    def feed(self, data):
+        self.bytes += len(data)
+        self._partial += data
+        end = self._partial.rfind(b"\n")
+        if end < 0:
+            if len(self._partial) > self.max_frame:
+                self._partial.clear()
+                self.resyncs += 1
+            return []
+
+        complete = bytes(self._partial[:end])
+        del self._partial[:end + 1]
+        if len(self._partial) > self.max_frame:
+            self._partial.clear()
+            self.resyncs += 1
+
+        lines = []
+        for line in complete.split(b"\n"):
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) > self.max_frame:
+                self.resyncs += 1
+                continue
+            lines.append(line)
+        self.frames += len(lines)
+        return lines
+
+    def reset(self):
+        self._partial.clear()
+
+
+# Reads whatever the port has buffered (at most block_size bytes per read)
+# instead of one line per call; blocks for up to the port timeout when idle.
+# protocol is "text" (checksummed lines), "binary" (binary_protocol frames) or
+# "auto": bytes are held back until one of them is recognised, and detection
+# starts over if the stream stops decoding (e.g. the firmware was reflashed).
+class ChunkedReader:
+    def __init__(self, ser, block_size=BLOCK_SIZE, max_frame=MAX_FRAME_SIZE, protocol="auto"):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"protocol must be one of {PROTOCOLS}, got {protocol!r}")
+        self.ser = ser
+        self.block_size = block_size
+        self.protocol = protocol
+        self.mode = None if protocol == "auto" else protocol
+        self.framer = LineFramer(max_frame)
+        self.binary = BinaryFramer()
+        self.bytes = 0
+        self.detections = 0
+        # Optional metrics.Histogram of decode time per frame (ns)
+        self.parse_time = None
+        self._probe = bytearray()
+        self._probe_size = 2 * max_frame
+        self._misses = 0
+        self._stale = 0
+
+    @property
+    def counters(self):
+        f, b = self.framer, self.binary
+        return {"mode": self.mode, "bytes": self.bytes, "frames": f.frames + b.frames,
+                "resyncs": f.resyncs + b.resyncs, "crc_errors": b.crc_errors,
+                "dropped": b.dropped, "detections": self.detections}
+
+    # Raw bytes received since the last call; None if the read timed out with
+    # no bytes at all
+    def _read(self):
+        waiting = self.ser.in_waiting
+        data = self.ser.read(min(waiting, self.block_size) if waiting else 1)
+        if not data:
+            return None
+        if not waiting:
+            # Woken by the first byte: pick up the rest of the burst too
+            more = self.ser.in_waiting
+            if more:
+                data += self.ser.read(min(more, self.block_size))
+        self.bytes += len(data)
+        return data
+
+    # Look for a valid binary frame or a checksummed text line in the bytes
+    # seen so far; returns the bytes to decode once the mode is known
+    def _detect(self, data):
+        probe = self._probe
+        probe += data
+        start = find_frame(probe)
+        if start >= 0:
+            self.mode = "binary"
+        else:
+            start = probe.find(b" CHK:")
+            if start < 0 or probe.find(b"\n", start) < 0:
+                del probe[:-self._probe_size]
+                return b""
+            self.mode = "text"
+            start = probe.rfind(b"\n", 0, start) + 1
+        self.detections += 1
+        data = bytes(probe[start:])
+        probe.clear()
+        return data
+
+    def _decode(self, data):
+        start = time.perf_counter_ns()
+        if self.mode == "binary":
+            results = self.binary.feed(data)
+        else:
+            results = [parse_line(line) for line in self.framer.feed(data)]
+        # One clock pair per read, spread over its frames
+        if self.parse_time is not None and results:
+            self.parse_time.observe((time.perf_counter_ns() - start) // len(results), len(results))
+        if profiler.enabled:
+            profiler.record("reader.decode", start, time.perf_counter_ns())
+        return results
+
+    # (ParseError, Sample or None) for every frame received since the last
+    # call; None if the read timed out with no bytes at all
+    def read_samples(self):
+        data = self._read()
+        if data is None:
+            return None
+        if self.mode is None:
+            data = self._detect(data)
+            if self.mode is None:
+                return []
+        results = self._decode(data)
+        if self.protocol == "auto":
+            self._stale += len(data)
+            for code, _ in results:
+                if code:
+                    self._misses += 1
+                else:
+                    self._misses = self._stale = 0
+            if self._misses >= DETECT_MISSES or self._stale >= DETECT_BYTES:
+                self.mode = None
+                self._misses = self._stale = 0
+                self.framer.reset()
+                self.binary.reset()
+        return results
@@ -4,17 +4,38 @@
 # jz587 and ak2444
 
 #Import Necessary Modules
+import argparse
 import tkinter as tk
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 #import statistics
 import arduino_communication
+from smoothing import Smoother, SmoothedChannel
+from decimate import DecimationCache
+from live_plots import LivePlots, BlitManager
+from ui_scheduler import UIScheduler
+from profiling import profiler
 
 MAX_POINTS = 50 
-
-# Start the serial reader first
-arduino_communication.start_reader()
+MA_KIND = "sma"     # "sma", "ema" or "median"
+MA_SAMPLES = 5
+UI_FPS = 4          # most redraws per second (only when new samples arrive)
+SENSOR_PAGES = ("TEMP", "HUM", "PRES", "LUX", "WIND")
+PAGE_IDLE_TIMEOUT = 300     # seconds a hidden detail page is kept before it is released (None: keep)
+
+# Profiling (also switched on by WEATHER_PROFILE=1): stage timings are printed
+# periodically, a Chrome trace is written at exit with --profile-trace
+parser = argparse.ArgumentParser(description="Weather Monitoring System dashboard")
+parser.add_argument("--profile", action="store_true", help="time the reader thread and GUI callbacks")
+parser.add_argument("--profile-trace", metavar="FILE", help="write a Chrome trace of the last minute at exit")
+args = parser.parse_args()
+if args.profile or args.profile_trace:
+    profiler.enable(trace_path=args.profile_trace)
+
+# Attach to a running headless logger (python -m arduino_communication) if there
+# is one, otherwise start the serial reader in this process
+try:
+    arduino_communication.attach()
+except OSError:
+    arduino_communication.start_reader()
 
 # Build the Tkinter Root
 root = tk.Tk()
@@ -57,19 +78,24 @@ def assign_colours(sensor, reading):
         else:
             return "#f5f5f5"
 
-# Calculate Moving Average to obtain a smoother curve
-def moving_avg(buffer, samples):
-    moving_avgs = []
-    global masamples
-    masamples = int(samples)
-    for i in range(len(buffer)):
-        if i < (masamples - 1):
-            moving_avgs.append(buffer[i])
-        else:
-            window = buffer[i-(masamples-1): i+1]
-            temp = sum(window) / masamples
-            moving_avgs.append(temp)
-    return moving_avgs
+# Moving Averages to obtain a smoother curve, updated incrementally over the whole buffer
+smoothed = {
+    "TEMP": SmoothedChannel(arduino_communication.buffer, "temp", Smoother(MA_KIND, MA_SAMPLES)),
+    "HUM":  SmoothedChannel(arduino_communication.buffer, "hum", Smoother(MA_KIND, MA_SAMPLES)),
+    "LUX":  SmoothedChannel(arduino_communication.buffer, "lux", Smoother(MA_KIND, MA_SAMPLES)),
+}
+
+# matplotlib is only imported once the first plot is built
+def new_figure(**kwargs):
+    from matplotlib.figure import Figure
+    return Figure(**kwargs)
+
+def figure_canvas(fig, master):
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    return FigureCanvasTkAgg(fig, master=master)
+
+# Redraws only the visible page, only when new samples arrived
+ui = UIScheduler(root, arduino_communication.buffer, UI_FPS)
 
 # GUI Frames
 frames = {}
@@ -79,34 +105,39 @@ def show_frame(name):
         f.pack_forget()
     frames[name].pack(fill="both", expand=True)
 
-# Updating live values
+# Updating live values (all from one consistent sample; run by the scheduler on new data)
+@ui.add
+@profiler.wrap()
 def update_live_values():
-    if len(arduino_communication.temperatures) > 0:
-        new_temp = arduino_communication.temperatures[-1]
+    snap = arduino_communication.buffer.snapshot(1)
+    latest = {name: col[-1] for name, col in snap.columns.items() if len(col)}
+
+    if "temp" in latest:
+        new_temp = latest["temp"]
         display_temp.set(f"🌡️ {new_temp:.2f} °C")
         temp_label.config(fg=assign_colours("TEMP", new_temp))
         # Update summary without icon
         summary_temp.set(f"{new_temp:.0f} °C")
 
-    if len(arduino_communication.humidities) > 0:
-        new_hum = arduino_communication.humidities[-1]
+    if "hum" in latest:
+        new_hum = latest["hum"]
         display_humidity.set(f"💧 {new_hum:.2f} %")
         hum_label.config(fg=assign_colours("HUM", new_hum))
         summary_hum.set(f"{new_hum:.0f} %")
 
-    if len(arduino_communication.luxintensities) > 0:
-        new_lux = arduino_communication.luxintensities[-1]
+    if "lux" in latest:
+        new_lux = latest["lux"]
         display_lux.set(f"💡 {new_lux:.2f} lux")
         lux_label.config(fg=assign_colours("LUX", new_lux))
         summary_lux.set(f"{new_lux:.0f} lux")
 
-    if len(arduino_communication.pressures) > 0:
-        new_pressure = arduino_communication.pressures[-1]
+    if "pres" in latest:
+        new_pressure = latest["pres"]
         display_pressure.set(f"🌪️ {new_pressure:.2f} hPa")
         pressure_label.config(fg=assign_colours("PRES", new_pressure))
 
-    if len(arduino_communication.wind_speeds) > 0:
-        temp_windspeed = arduino_communication.wind_speeds[-1]
+    if "wind" in latest:
+        temp_windspeed = latest["wind"]
         if temp_windspeed < 0.20:
             new_windspeed = 0
             wind_desc = "No Wind"
@@ -121,118 +152,24 @@ def update_live_values():
         windspeed_label.config(fg=assign_colours("WS", new_windspeed))
         summary_wind.set(f"{wind_desc}")
 
-    root.after(1000, update_live_values)
-
-
-# Update home live plots
-def update_live_plots(_):
-    td = arduino_communication.temperatures[-MAX_POINTS:]
-    hd = arduino_communication.humidities[-MAX_POINTS:]
-    ld = arduino_communication.luxintensities[-MAX_POINTS:]
-
-    tma = moving_avg(td, 5)
-    hma = moving_avg(hd, 5)
-    lma = moving_avg(ld, 5)
-
-    buffers = {
-    "TEMP": {"data": td, "madata": tma, "Variable": "Temperature", "Unit": "°C", "AXIS" : axes[0], "THRESH" : 26},
-    "HUM": {"data": hd, "madata": hma, "Variable": "Humidity", "Unit": "%", "AXIS" : axes[1], "THRESH" : 60},
-    "LUX": {"data": ld, "madata": lma, "Variable": "Light Intensity", "Unit": "lux", "AXIS" : axes[2], "THRESH" : 100}
-    }
-
-    # for buf, ma_buf, title, unit, ax, thresh in buffers:
-    #buffers = [(td, tma, "Temperature", "°C", axes[0], 26), (hd, hma, "Humidity", "%", axes[1], 60), (ld, lma, "Light", "lux", axes[2], 50)]
-    for key, value in buffers.items():
-        buf      = value["data"]
-        ma_buf   = value["madata"]
-        title    = value["Variable"]
-        unit     = value["Unit"]
-        ax       = value["AXIS"]
-        thresh   = value["THRESH"]
-
-        ax.clear()        
-        if ma_buf and len(ma_buf) == len(buf):
-            ax.plot(
-                ma_buf,
-                color="#ffe082",
-                linestyle="--",
-                linewidth=1.2,
-                label=f"{masamples}-sample Moving Average"
-            )
-        ax.plot(buf, color="#80cbc4", linewidth=1.2, label="Raw")
-
-
-        ax.axhline(y=thresh, color="#ff8a65", linewidth=1)
-
-        if title == "Temperature":
-            xs = [i for i, v in enumerate(buf) if v > thresh]
-            ys = [buf[i] for i in xs]
-            ax.scatter(xs, ys, color="#e57373", s=30, label=">26°C")
-        elif title == "Humidity":
-            xs = [i for i, v in enumerate(buf) if v > thresh]
-            ys = [buf[i] for i in xs]
-            ax.scatter(xs, ys, color="#64b5f6", s=30, label=">60%")
-        elif title == "Light":
-            xs = [i for i, v in enumerate(buf) if v < thresh]
-            ys = [buf[i] for i in xs]
-            ax.scatter(xs, ys, color="#ffb74d", s=30, label="<50 lux")
-
-        ax.set_title(
-            title,
-            color="white",
-            pad=6,
-            fontdict={"family": "Verdana", "size": 24, "weight": "bold"}
-        )
-        ax.set_ylabel(
-            unit,
-            color="white",
-            fontdict={"family": "Verdana", "size": 20}
-        )
-        ax.set_facecolor("#1e1e2e")
-        ax.grid(True, linestyle="--", alpha=0.3)
-        ax.tick_params(axis='x', colors='white', labelrotation=45)
-        ax.tick_params(axis='y', colors='white')
-        ax.title.set_color("white")
-        ax.yaxis.label.set_color("white")
-        ax.set_ylim(bottom=0)
-        ax.legend(
-            loc="upper right",
-            facecolor="#2e2e3e",
-            edgecolor="#555555",
-            labelcolor="white",
-            fontsize = 20
-        )
 
 
 historical_canvases = {}
 
+# Decimated "All samples" series, reused until new data arrives
+decimation_cache = DecimationCache(arduino_communication.buffer)
 
-def compute_stats(data):
-    if len(data) == 0:
-        return (None, None, None)
-    minimum = min(data)
-    maximum = max(data)
-    avg = sum(data) / len(data)
-    return (minimum, maximum, avg)
 
-# Update plots of old data
-def update_historical_plot(sensor_key):
-    if sensor_key == "TEMP":
-        buf = arduino_communication.temperatures
-    elif sensor_key == "HUM":
-        buf = arduino_communication.humidities
-    elif sensor_key == "PRES":
-        buf = arduino_communication.pressures
-    elif sensor_key == "LUX":
-        buf = arduino_communication.luxintensities
-    elif sensor_key == "WIND":
-        buf = arduino_communication.wind_speeds
-    else:
-        buf = []
 
-    mn, mx, avg = compute_stats(buf)
+# Ring buffer channel behind each sensor page
+channel_names = {"TEMP": "temp", "HUM": "hum", "PRES": "pres", "LUX": "lux", "WIND": "wind"}
 
-    min_lbl, max_lbl, avg_lbl, fig_hist, ax_hist, ax_hist100, ax_hist200, canvas_hist = historical_canvases[sensor_key]
+# Update Min/Max/Avg labels from the running statistics kept by the reader (O(1))
+@profiler.wrap()
+def update_stats_labels(sensor_key):
+    mn, mx, avg = arduino_communication.stats[channel_names[sensor_key]].overall.summary()
+
+    min_lbl, max_lbl, avg_lbl = historical_canvases[sensor_key][:3]
 
     if mn is None:
         min_lbl.config(text="Min: —")
@@ -243,8 +180,27 @@ def update_historical_plot(sensor_key):
         max_lbl.config(text=f"Max: {mx:.2f}")
         avg_lbl.config(text=f"Avg: {avg:.2f}")
 
+# Buffer version each sensor page was last drawn at
+historical_versions = {}
+
+# Update plots of old data (not redrawn if no sample arrived since the last time)
+@profiler.wrap()
+def update_historical_plot(sensor_key):
+    snap = arduino_communication.buffer.snapshot(201)
+    if historical_versions.get(sensor_key) == snap.version:
+        return
+    historical_versions[sensor_key] = snap.version
+    buf = snap.columns[channel_names[sensor_key]]
+
+    update_stats_labels(sensor_key)
+
+    min_lbl, max_lbl, avg_lbl, fig_hist, ax_hist, ax_hist100, ax_hist200, canvas_hist = historical_canvases[sensor_key]
+
+    # Plot about two points per pixel column, keeping peaks and troughs
+    n_out = 2 * int(ax_hist.get_window_extent().width)
+    xs, ys = decimation_cache.get(channel_names[sensor_key], n_out)
     ax_hist.clear()
-    ax_hist.plot(buf, color="#80cbc4", linewidth=1.5)
+    ax_hist.plot(xs, ys, color="#80cbc4", linewidth=1.5)
     quick_dict2 = {
         "TEMP": "Temperature",
         "HUM":  "Humidity",
@@ -321,6 +277,7 @@ def update_historical_plot(sensor_key):
     canvas_hist.draw()
 
 # Creating individual sensor pages
+@profiler.wrap()
 def create_sensor_page(sensor_key):
     frame = tk.Frame(root, bg="#1e1e2e")
     frames[sensor_key] = frame
@@ -375,13 +332,8 @@ def create_sensor_page(sensor_key):
             return
         big.config(fg=assign_colours(sensor_key, val))
 
-    {
-        "TEMP": display_temp,
-        "HUM":  display_humidity,
-        "PRES": display_pressure,
-        "LUX":  display_lux,
-        "WIND": display_windspeed
-    }[sensor_key].trace_add("write", recolour_big)
+    # Only while the page is visible (after update_live_values has set the text)
+    ui.add(recolour_big, pages=(sensor_key,))
 
     stats_f = tk.Frame(frame, bg="#1e1e2e", bd=1, relief="solid", padx=20, pady=15)
     stats_f.pack(pady=20, padx=50)
@@ -418,7 +370,7 @@ def create_sensor_page(sensor_key):
     hist_frame = tk.Frame(frame, bg="#1e1e2e")
     hist_frame.pack(expand=True, fill="both", padx=50, pady=10)
 
-    fig_hist = plt.Figure(figsize=(12, 6), dpi=200, facecolor="#1e1e2e")
+    fig_hist = new_figure(figsize=(12, 6), dpi=200, facecolor="#1e1e2e")
     ax_hist = fig_hist.add_subplot(311)
     ax_hist.set_facecolor("#1e1e2e")
     ax_hist100 = fig_hist.add_subplot(312)
@@ -426,24 +378,42 @@ def create_sensor_page(sensor_key):
     ax_hist200 = fig_hist.add_subplot(313)
     ax_hist200.set_facecolor("#1e1e2e")
 
-    canvas_hist = FigureCanvasTkAgg(fig_hist, master=hist_frame)
+    canvas_hist = figure_canvas(fig_hist, hist_frame)
     canvas_hist.get_tk_widget().pack(expand=True, fill="both", anchor="center")
 
     historical_canvases[sensor_key] = (min_lbl, max_lbl, avg_lbl, fig_hist, ax_hist, ax_hist100, ax_hist200, canvas_hist)
 
-    update_historical_plot(sensor_key)
+    # Plots are redrawn when the page is opened, statistics whenever data arrives
+    ui.on_show(sensor_key, lambda: update_historical_plot(sensor_key))
+    ui.add(lambda: update_stats_labels(sensor_key), pages=(sensor_key,))
 
     return frame
 
-for key in ["TEMP", "HUM", "PRES", "LUX", "WIND"]:
-    create_sensor_page(key)
+# Detail pages are built the first time they are opened, and released again
+# after PAGE_IDLE_TIMEOUT seconds hidden (pending release: page -> after id)
+page_release = {}
+
+def release_sensor_page(sensor_key):
+    page_release.pop(sensor_key, None)
+    if ui.visible == sensor_key or sensor_key not in frames:
+        return
+    ui.remove(sensor_key)
+    historical_canvases.pop(sensor_key)
+    historical_versions.pop(sensor_key, None)
+    frames.pop(sensor_key).destroy()
 
 old_frame = show_frame
 
 def show_frame(name):
-    if name in ["TEMP", "HUM", "PRES", "LUX", "WIND"]:
-        update_historical_plot(name)
+    if name in SENSOR_PAGES and name not in frames:
+        create_sensor_page(name)
+    if name in page_release:
+        root.after_cancel(page_release.pop(name))
+    hidden = ui.visible
     old_frame(name)
+    ui.show(name)
+    if hidden in SENSOR_PAGES and hidden != name and PAGE_IDLE_TIMEOUT is not None:
+        page_release[hidden] = root.after(int(PAGE_IDLE_TIMEOUT * 1000), lambda: release_sensor_page(hidden))
 
 # Home page
 home = tk.Frame(root, bg="#1e1e2e")
@@ -577,16 +547,31 @@ tk.Button(
 plot_container = tk.Frame(home, bg="#1e1e2e")
 plot_container.pack(expand=True, fill="both", padx=10, pady=10)
 
-fig, axes = plt.subplots(1, 3, figsize=(12, 5), dpi=100)
-fig.patch.set_facecolor("#1e1e2e")
-for ax in axes:
-    ax.set_facecolor("#1e1e2e")
+# Home plots: built once the window is up (so matplotlib loads after the first
+# paint), then only the changed artists are blitted
+def create_home_plots():
+    fig = new_figure(figsize=(12, 5), dpi=100, facecolor="#1e1e2e")
+    axes = fig.subplots(1, 3)
+    for ax in axes:
+        ax.set_facecolor("#1e1e2e")
+
+    canvas = figure_canvas(fig, plot_container)
+    canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    live_plots = LivePlots(axes, arduino_communication.buffer, smoothed, arduino_communication.alerts,
+                           MAX_POINTS, MA_SAMPLES)
+    blitter = BlitManager(canvas, live_plots.animated_artists())
+
+    @profiler.wrap()
+    def update_home_plots():
+        live_plots.update()
+        blitter.update()
 
-canvas = FigureCanvasTkAgg(fig, master=plot_container)
-canvas.get_tk_widget().pack(expand=True, fill="both")
+    ui.add(update_home_plots, pages=("home",))
+    ui.invalidate("home")
 
-ani = animation.FuncAnimation(fig, update_live_plots, interval=500)
 
 show_frame("home")
-root.after(1000, update_live_values)
+root.after_idle(create_home_plots)
+ui.start()
 root.mainloop()
@@ -0,0 +1,163 @@
+# live_plots.py
+# Home page live plots built from long-lived matplotlib artists
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Kept free of tkinter so the plots can also be driven on an off-screen canvas
+# (see benchmark.py)
+
+# Import Necessary Modules
+import numpy as np
+
+# Home live plot configuration; thresholds come from the alert rule (alerts.py)
+LIVE_PLOT_CONFIG = {
+    "TEMP": {"Variable": "Temperature", "Unit": "°C", "Rule": "temp_high", "Channel": "temp"},
+    "HUM":  {"Variable": "Humidity", "Unit": "%", "Rule": "hum_high", "Channel": "hum"},
+    "LUX":  {"Variable": "Light Intensity", "Unit": "lux", "Rule": "lux_low", "Channel": "lux"},
+}
+# Colour of the markers on samples while the plot's alert is raised
+LIVE_PLOT_MARKERS = {
+    "TEMP": "#e57373",
+    "HUM":  "#64b5f6",
+    "LUX":  "#fff176",
+}
+
+
+# Grow the y-axis when data leaves it, shrink it when data only uses a small part.
+# Returns True if the limits changed (the blit background must then be redrawn).
+def rescale_live_axis(ax, top_value):
+    bottom, top = ax.get_ylim()
+    if top_value > top or top_value < 0.5 * top:
+        ax.set_ylim(bottom, max(top_value, 1e-6) * 1.1)
+        return True
+    return False
+
+
+# The home plots: artists are created once and update() only changes their data.
+# Samples are marked while their alert is raised, from the alert engine's
+# interval index (a plot without a rule in `alerts` has no threshold).
+class LivePlots:
+    def __init__(self, axes, buffer, smoothed, alerts, max_points, ma_samples):
+        self.buffer = buffer
+        self.smoothed = smoothed
+        self.alerts = alerts
+        self.max_points = max_points
+        self.version = -1           # buffer version the artists currently show
+        self.artists = {}
+        for ax, (key, value) in zip(axes, LIVE_PLOT_CONFIG.items()):
+            self._setup_axis(ax, key, value, ma_samples)
+
+    def _setup_axis(self, ax, key, value, ma_samples):
+        rule = self.alerts.rules.get(value["Rule"])
+
+        ma_line, = ax.plot(
+            [], [],
+            color="#ffe082",
+            linestyle="--",
+            linewidth=1.2,
+            label=f"{ma_samples}-sample Moving Average"
+        )
+        raw_line, = ax.plot([], [], color="#80cbc4", linewidth=1.2, label="Raw")
+
+        marks = None
+        if rule is not None:
+            ax.axhline(y=rule.threshold, color="#ff8a65", linewidth=1)
+            # Markers follow the raised intervals, so with hysteresis they
+            # also cover samples just back inside the threshold
+            marks = ax.scatter(np.empty(0), np.empty(0), color=LIVE_PLOT_MARKERS.get(key, "#e57373"), s=30,
+                               label=f"{rule.name} raised")
+
+        ax.set_title(
+            value["Variable"],
+            color="white",
+            pad=6,
+            fontdict={"family": "Verdana", "size": 24, "weight": "bold"}
+        )
+        ax.set_ylabel(
+            value["Unit"],
+            color="white",
+            fontdict={"family": "Verdana", "size": 20}
+        )
+        ax.set_facecolor("#1e1e2e")
+        ax.grid(True, linestyle="--", alpha=0.3)
+        ax.tick_params(axis='x', colors='white', labelrotation=45)
+        ax.tick_params(axis='y', colors='white')
+        ax.set_xlim(0, self.max_points - 1)
+        ax.set_ylim(0, (rule.threshold if rule is not None else 1) * 1.1)
+        ax.legend(
+            loc="upper right",
+            facecolor="#2e2e3e",
+            edgecolor="#555555",
+            labelcolor="white",
+            fontsize = 20
+        )
+
+        self.artists[key] = {"AXIS": ax, "RAW": raw_line, "MA": ma_line, "MARKS": marks, "RULE": rule}
+
+    # Animated artists, in the order update() returns them for blitting
+    def animated_artists(self):
+        return [a for artists in self.artists.values() for a in (artists["MA"], artists["RAW"], artists["MARKS"]) if a is not None]
+
+    # Update home live plots (blitted: only the returned artists are redrawn).
+    # All channels come from one buffer snapshot; nothing is recomputed when the
+    # buffer has not changed since the last frame.
+    def update(self, _=None):
+        snap = self.buffer.snapshot(self.max_points)
+        if snap.version == self.version:
+            return self.animated_artists()
+        self.version = snap.version
+
+        rescaled = False
+        xs = np.arange(len(snap.timestamps))
+        for key, value in LIVE_PLOT_CONFIG.items():
+            buf = snap.columns[value["Channel"]]
+            ma_buf = self.smoothed[key].latest(len(buf), snap.version)
+            artists = self.artists[key]
+            rule = artists["RULE"]
+
+            artists["RAW"].set_data(xs, buf)
+            if len(ma_buf) == len(buf):
+                artists["MA"].set_data(xs, ma_buf)
+
+            if rule is not None:
+                mask = self.alerts.intervals(rule.name).mask(snap.timestamps)
+                artists["MARKS"].set_offsets(np.column_stack((xs[mask], buf[mask])))
+
+            if len(buf):
+                top = float(buf.max())
+                rescaled |= rescale_live_axis(artists["AXIS"], max(top, rule.threshold) if rule is not None else top)
+
+        if rescaled:
+            next(iter(self.artists.values()))["AXIS"].figure.canvas.draw_idle()
+
+        return self.animated_artists()
+
+
+# Blits a fixed set of animated artists over a cached background, the way
+# FuncAnimation does, but only when update() is called (see ui_scheduler.py).
+# The background is re-captured after every full draw (resize, rescaled axes).
+class BlitManager:
+    def __init__(self, canvas, artists):
+        self.canvas = canvas
+        self.artists = list(artists)
+        self._background = None
+        for artist in self.artists:
+            artist.set_animated(True)
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
+
+    def update(self):
+        if self._background is None:
+            # Not drawn yet: the draw_event will paint the artists
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
@@ -0,0 +1,171 @@
+# log_index.py
+# Sidecar index of a CSV log for time-range queries without a full scan
+# SF4: Data Logger
+# jz587 and ak2444
+
+# The index (<log>.idx) is a flat array of little-endian (i8 timestamp, i8 byte
+# offset) entries, one per block of rows: the first row of each block starts at
+# that offset. It is appended to as rows are written, so a query only has to
+# bisect it and seek; memory stays at 16 bytes per block however big the log.
+
+# Import Necessary Modules
+import argparse
+import os
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from binary_log import iso_to_ns
+
+INDEX_SUFFIX = ".idx"
+BLOCK_ROWS = 1024
+ENTRY_STRUCT = struct.Struct("<qq")
+ENTRY_DTYPE = np.dtype([("timestamp", "<i8"), ("offset", "<i8")])
+
+
+def index_path(csv_path):
+    return csv_path + INDEX_SUFFIX
+
+
+# Remove the index of a log that is being recreated
+def remove_index(csv_path):
+    try:
+        os.remove(index_path(csv_path))
+    except FileNotFoundError:
+        pass
+
+
+# Index entries as a structured array of ENTRY_DTYPE (empty if there is no index)
+def read_index(csv_path):
+    try:
+        with open(index_path(csv_path), 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # A writer may be half way through appending an entry
+            return np.fromfile(f, dtype=ENTRY_DTYPE, count=size // ENTRY_DTYPE.itemsize)
+    except FileNotFoundError:
+        return np.zeros(0, dtype=ENTRY_DTYPE)
+
+
+# Timestamp (epoch ns) and values of one CSV data line, or None if unreadable
+def _parse(line):
+    fields = line.decode('ascii', 'replace').strip().split(',')
+    try:
+        return iso_to_ns(fields[0]), tuple(float(v) for v in fields[1:])
+    except (ValueError, IndexError):
+        return None
+
+
+# Index an existing log from scratch with one sequential pass
+def build_index(csv_path, block_rows=BLOCK_ROWS):
+    entries = []
+    with open(csv_path, 'rb') as f:
+        f.readline()                # header
+        rows = 0
+        offset = f.tell()
+        for line in iter(f.readline, b""):
+            if rows % block_rows == 0:
+                parsed = _parse(line)
+                if parsed is None:
+                    offset += len(line)
+                    continue
+                entries.append(ENTRY_STRUCT.pack(parsed[0], offset))
+            rows += 1
+            offset += len(line)
+    with open(index_path(csv_path), 'wb') as f:
+        f.write(b"".join(entries))
+    return len(entries)
+
+
+# Kept by the CSV writer thread: records where every block_rows-th row starts.
+# An existing log without an index is indexed first.
+class LogIndexWriter:
+    def __init__(self, csv_path, block_rows=BLOCK_ROWS):
+        self.csv_path = csv_path
+        self.path = index_path(csv_path)
+        self.block_rows = max(int(block_rows), 1)
+        self._rows = 0              # rows written since the last entry
+        self._f = None
+
+    def open(self):
+        if not os.path.exists(self.path):
+            build_index(self.csv_path, self.block_rows)
+        self._f = open(self.path, 'ab')
+        # Start a fresh block: the rows after the last entry are not known here
+        self._rows = self.block_rows
+        return self
+
+    # Rows that can still be written before the next entry is due
+    def room(self):
+        return self.block_rows - self._rows if self._rows < self.block_rows else 0
+
+    # Start a block at byte offset `offset` whose first row has time `when`
+    def add(self, when, offset):
+        ts = when if isinstance(when, int) else int(when.timestamp() * 1e6) * 1000
+        self._f.write(ENTRY_STRUCT.pack(ts, offset))
+        self._rows = 0
+
+    def wrote(self, n):
+        self._rows += n
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+# Rows with t0 <= timestamp <= t1 (epoch ns; None for open ended) as
+# (timestamp, values) pairs, streamed from the block holding t0 and stopping at
+# the first row past t1. Assumes timestamps only move forward in the log.
+def query_log(csv_path, t0=None, t1=None):
+    t0, t1 = log_precision(t0), log_precision(t1)
+    entries = read_index(csv_path)
+    block = -1
+    if t0 is not None and len(entries):
+        block = int(np.searchsorted(entries["timestamp"], t0, side="left")) - 1
+    with open(csv_path, 'rb') as f:
+        if block >= 0:
+            f.seek(int(entries["offset"][block]))
+        else:
+            f.readline()            # header
+        yield from scan_rows(f, t0, t1)
+
+
+# Round a time (epoch ns) to the log's microseconds, the way the writer does
+def log_precision(t):
+    if t is None:
+        return None
+    return iso_to_ns(datetime.fromtimestamp(t / 1e9).isoformat())
+
+
+# Rows of an open binary file (positioned past the header) within [t0, t1]
+def scan_rows(f, t0=None, t1=None):
+    for line in f:
+        parsed = _parse(line)
+        if parsed is None:
+            continue
+        if t0 is not None and parsed[0] < t0:
+            continue
+        if t1 is not None and parsed[0] > t1:
+            return
+        yield parsed
+
+
+def _to_ns(text):
+    return None if text is None else iso_to_ns(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the rows of a CSV log within a time range")
+    parser.add_argument("csv_path")
+    parser.add_argument("--start", help="ISO timestamp, e.g. 2024-05-14T02:00")
+    parser.add_argument("--end", help="ISO timestamp, e.g. 2024-05-14T03:00")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index first")
+    args = parser.parse_args()
+    if args.rebuild or not os.path.exists(index_path(args.csv_path)):
+        print(f"Indexed {build_index(args.csv_path)} blocks")
+    for ts, values in query_log(args.csv_path, _to_ns(args.start), _to_ns(args.end)):
+        print(datetime.fromtimestamp(ts / 1e9).isoformat(), *values, sep=',')
@@ -0,0 +1,211 @@
+# log_rotation.py
+# Time/size based rotation of the CSV log, background compression of closed
+# segments and reading back across all of them
+# SF4: Data Logger
+# jz587 and ak2444
+
+# The active log keeps its configured name (e.g. weather_monitoring.csv). On
+# rotation it is renamed after the time of its first row, for example
+# weather_monitoring-20240514T020000.csv, and a worker thread then compresses it
+# to .csv.gz (or .csv.zst) so neither the serial nor the writer thread waits.
+
+# Import Necessary Modules
+import gzip
+import os
+import queue
+import re
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+from log_index import index_path, log_precision, query_log, scan_rows
+
+ROTATE_INTERVALS = {"hourly": 3600, "daily": 86400}
+COMPRESSORS = {"gzip": ".gz", "zstd": ".zst"}
+_STAMP = "%Y%m%dT%H%M%S"
+_STAMP_NS = 1_000_000_000   # resolution of a segment name's start time
+_STOP = object()
+
+
+def _open_zstd(path, mode):
+    import zstandard        # optional: only needed for zstd segments
+    return zstandard.open(path, mode)
+
+
+_OPENERS = {".gz": gzip.open, ".zst": _open_zstd}
+
+
+# Open a log file or segment for binary reading, compressed or not
+def open_segment(path):
+    return _OPENERS.get(os.path.splitext(path)[1], open)(path, 'rb')
+
+
+# Free name for a segment starting at `start` (a suffix is added on a clash)
+def segment_path(path, start):
+    stem, ext = os.path.splitext(path)
+    base = f"{stem}-{start.strftime(_STAMP)}"
+    candidate, n = base + ext, 1
+    while any(os.path.exists(candidate + suffix) for suffix in ("", *COMPRESSORS.values())):
+        candidate, n = f"{base}-{n}{ext}", n + 1
+    return candidate
+
+
+# Closed segments of a log as (start epoch ns, path), oldest first. A segment
+# caught between compression and removal is listed once, uncompressed.
+def list_segments(path):
+    directory = os.path.dirname(path) or "."
+    stem, ext = os.path.splitext(os.path.basename(path))
+    pattern = re.compile(re.escape(stem) + r"-(\d{8}T\d{6})(?:-(\d+))?" + re.escape(ext)
+                         + r"(\.gz|\.zst)?$")
+    found = {}
+    for name in sorted(os.listdir(directory)):
+        m = pattern.match(name)
+        if m is None:
+            continue
+        start = int(datetime.strptime(m.group(1), _STAMP).timestamp()) * 1_000_000_000
+        found.setdefault((start, int(m.group(2) or 0)), os.path.join(directory, name))
+    return [(key[0], found[key]) for key in sorted(found)]
+
+
+# Rows of the whole log within [t0, t1] (epoch ns; None for open ended) as
+# (timestamp, values) pairs, oldest first: the closed segments, compressed or
+# not, then the active file. Segments outside the range are not opened.
+def read_log(path, t0=None, t1=None):
+    segments = list_segments(path)
+    if os.path.exists(path):
+        segments.append((None, path))
+    for i, (start, segment) in enumerate(segments):
+        following = segments[i + 1][0] if i + 1 < len(segments) else None
+        if t1 is not None and start is not None and start > t1:
+            return
+        # Segment names hold whole seconds, so the next segment may really
+        # start up to a second after `following` (several size-rotated
+        # segments can start in the same second): only skip a segment when
+        # all of that second is before t0
+        if t0 is not None and following is not None and following + _STAMP_NS <= t0:
+            continue
+        opener = _OPENERS.get(os.path.splitext(segment)[1])
+        if opener is None:
+            yield from query_log(segment, t0, t1)
+            continue
+        with opener(segment, 'rb') as f:
+            f.readline()            # header
+            yield from scan_rows(f, log_precision(t0), log_precision(t1))
+
+
+# Time of the first data row of a CSV log, or None if it has none
+def _first_row_time(path):
+    try:
+        with open(path, 'rb') as f:
+            f.readline()
+            first = f.readline().split(b",", 1)[0]
+        return datetime.fromisoformat(first.decode('ascii')) if first.strip() else None
+    except (FileNotFoundError, ValueError, UnicodeDecodeError):
+        return None
+
+
+# Worker thread compressing closed segments; the original (and its index) is
+# removed once the compressed copy is complete
+class LogCompressor:
+    def __init__(self, method="gzip"):
+        if method not in COMPRESSORS:
+            raise ValueError(f"compression must be one of {tuple(COMPRESSORS)}, got {method!r}")
+        self.extension = COMPRESSORS[method]
+        self.compressed = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="log-compressor", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, path):
+        self._queue.put(path)
+
+    # Let queued segments finish; with wait=False an interrupted one is simply
+    # compressed again the next time the logger starts
+    def close(self, wait=False):
+        self._queue.put(_STOP)
+        if wait and self._thread.is_alive():
+            self._thread.join()
+
+    def compress(self, path):
+        target = path + self.extension
+        tmp = target + ".tmp"
+        with open(path, 'rb') as src, _OPENERS[self.extension](tmp, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(tmp, target)
+        os.remove(path)
+        if os.path.exists(index_path(path)):
+            os.remove(index_path(path))
+        self.compressed += 1
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            if path is _STOP:
+                return
+            try:
+                self.compress(path)
+            except (OSError, ImportError) as e:
+                print("Could not compress", path, e)
+
+
+# Used by the CSV writer thread to decide when to start a new segment: when a
+# row's time reaches the next interval boundary (intervals are counted from
+# local midnight) or, checked at each flush, when the file reaches max_bytes
+class LogRotation:
+    def __init__(self, path, header, interval=None, max_bytes=None, compress="gzip"):
+        self.path = path
+        self.header = header        # written at the top of every new segment
+        self.interval = ROTATE_INTERVALS.get(interval, interval)
+        self.max_bytes = max_bytes
+        self.compressor = LogCompressor(compress) if compress else None
+        self.start = None           # time of the active segment's first row
+        self.boundary = None
+        self.segments = 0
+
+    # Pick up an existing active file and queue segments left uncompressed
+    def open(self):
+        self._begin(_first_row_time(self.path))
+        if self.compressor is not None:
+            self.compressor.start()
+            for _, segment in list_segments(self.path):
+                if os.path.splitext(segment)[1] not in _OPENERS:
+                    self.compressor.submit(segment)
+        return self
+
+    def _begin(self, when):
+        self.start = when
+        self.boundary = None
+        if when is not None and self.interval:
+            midnight = when.replace(hour=0, minute=0, second=0, microsecond=0)
+            elapsed = (when - midnight).total_seconds()
+            self.boundary = midnight + timedelta(seconds=(elapsed // self.interval + 1) * self.interval)
+
+    # True if a row stamped `when` belongs in a new segment
+    def due(self, when):
+        if self.start is None:
+            self._begin(when)
+            return False
+        return self.boundary is not None and when >= self.boundary
+
+    def oversize(self, size):
+        return self.max_bytes is not None and size >= self.max_bytes
+
+    # Rename the active file (closed by the caller) to a segment and queue it
+    # for compression; the caller then creates a fresh active file
+    def rotate(self, next_start=None):
+        segment = segment_path(self.path, self.start)
+        os.replace(self.path, segment)
+        if os.path.exists(index_path(self.path)):
+            os.replace(index_path(self.path), index_path(segment))
+        if self.compressor is not None:
+            self.compressor.submit(segment)
+        self.segments += 1
+        self._begin(next_start)
+        return segment
+
+    def close(self, wait=False):
+        if self.compressor is not None:
+            self.compressor.close(wait)
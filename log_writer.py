@@ -0,0 +1,250 @@
+# log_writer.py
+# Batched, buffered CSV writer running on its own thread
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+import csv
+import os
+import queue
+import threading
+import time
+
+from log_index import LogIndexWriter, remove_index
+from profiling import profiler
+
+# When to fsync the log file: never, after every batch flush, or only on close
+FSYNC_POLICIES = ("never", "flush", "close")
+# Rows waiting for the writer thread; past this, new rows are dropped (and
+# counted) rather than letting memory grow while the disk is stalled
+MAX_QUEUE_ROWS = 100000
+
+_STOP = object()
+
+
+# Raised by BatchedCSVWriter.write()/close() once its thread has stopped on an error
+class LogWriterError(RuntimeError):
+    pass
+
+
+# Create a new log file holding only the header row (clearing any past data)
+def create_csv_log(path, header):
+    with open(path, 'w', newline='') as f:
+        csv.writer(f).writerow(header)
+    remove_index(path)
+
+
+# Keep an existing log and append to it; create it if missing or empty. A row
+# left half written by a crash is cut off first, so that the first new row
+# does not run into it.
+def open_csv_log(path, header):
+    if not os.path.exists(path) or os.path.getsize(path) == 0 or not _cut_torn_row(path):
+        create_csv_log(path, header)
+
+
+# Truncate a file back to the end of its last complete line; False if it has none
+def _cut_torn_row(path, block=4096):
+    with open(path, 'r+b') as f:
+        end = pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            start = max(pos - block, 0)
+            f.seek(start)
+            data = f.read(pos - start)
+            i = data.rfind(b"\n")
+            if i >= 0:
+                if start + i + 1 < end:
+                    f.truncate(start + i + 1)
+                return True
+            pos = start
+    return False
+
+
+# Format a (datetime, temp, hum, pres, lux, wind) sample as a CSV row
+def format_row(row):
+    now, *values = row
+    return [now.isoformat()] + [f"{v:.2f}" for v in values]
+
+
+# Writer stage fed by a queue; rows are coalesced and flushed every
+# flush_rows rows or flush_interval seconds, whichever comes first.
+# With index_rows set, a log_index sidecar records where every index_rows-th
+# row starts; with a log_rotation.LogRotation the file is split into segments
+# (rows must then begin with their datetime). With a metrics.Histogram as
+# latency, the time from each row's datetime to it being written (not yet
+# flushed) is recorded too.
+# If writing fails (formatter, disk full, rotation...), the thread reports the
+# error and stops, and the next write() or close() raises it.
+class BatchedCSVWriter:
+    def __init__(self, path, flush_rows=50, flush_interval=1.0, fsync="never", formatter=format_row,
+                 index_rows=None, rotation=None, latency=None, max_queue=MAX_QUEUE_ROWS):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = path
+        self.flush_rows = max(int(flush_rows), 1)
+        self.flush_interval = float(flush_interval)
+        self.fsync = fsync
+        self.formatter = formatter
+        self.index_rows = index_rows
+        self.rotation = rotation
+        self.latency = latency
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.dropped = 0            # rows not queued because the queue was full
+        self.error = None           # exception that stopped the writer thread
+        self._f = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="csv-writer", daemon=True)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    # Called from the serial thread: O(1), no formatting or I/O, never blocks
+    def write(self, row):
+        self._check()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    # Stop the writer thread after everything queued so far has been written
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._check()
+
+    def _check(self):
+        if self.error is not None:
+            raise LogWriterError(f"{self.path}: CSV writer stopped: {self.error!r}") from self.error
+
+    def _flush(self, sync):
+        self._f.flush()
+        end = self._f.tell()
+        self.bytes_written += end - self._flushed_to
+        self._flushed_to = end
+        if sync:
+            os.fsync(self._f.fileno())
+        # After the rows, so an entry never points past the data on disk
+        if self._index is not None:
+            self._index.flush()
+
+    def _open(self):
+        self._f = open(self.path, 'a', newline='')
+        self._csv = csv.writer(self._f)
+        self._flushed_to = self._f.tell()
+        self._index = LogIndexWriter(self.path, self.index_rows).open() if self.index_rows else None
+
+    def _close_file(self):
+        self._flush(self.fsync != "never")
+        self._f.close()
+        if self._index is not None:
+            self._index.close()
+
+    # Close the active file, hand it to the rotation policy and start a new one
+    def _rotate(self, next_start=None):
+        self._close_file()
+        self.rotation.rotate(next_start)
+        create_csv_log(self.path, self.rotation.header)
+        self._open()
+
+    # Write a batch, adding an index entry at the start of every block
+    def _write_rows(self, items, batch):
+        index = self._index
+        if index is None:
+            self._csv.writerows(batch)
+            return
+        i = 0
+        while i < len(batch):
+            room = index.room()
+            if not room:
+                index.add(items[i][0], self._f.tell())
+                room = index.room()
+            self._csv.writerows(batch[i:i + room])
+            index.wrote(min(room, len(batch) - i))
+            i += room
+
+    # Write a batch, starting a new segment before any row the rotation policy asks for
+    def _write(self, items, batch):
+        start = 0
+        if self.rotation is not None:
+            for i, item in enumerate(items):
+                if self.rotation.due(item[0]):
+                    self._write_rows(items[start:i], batch[start:i])
+                    self._rotate(item[0])
+                    start = i
+        self._write_rows(items[start:], batch[start:])
+
+    def _run(self):
+        try:
+            self._loop()
+        except Exception as e:
+            self.error = e
+            print(f"{self.path}: CSV writer stopped: {e!r}")
+            if self._f is not None and not self._f.closed:
+                try:
+                    self._f.close()
+                except OSError:
+                    pass
+
+    def _loop(self):
+        if self.rotation is not None:
+            self.rotation.open()
+        self._open()
+        pending = 0
+        last_flush = time.monotonic()
+        stopping = False
+
+        while not stopping:
+            # Only wake up on a timer while there are unflushed rows
+            timeout = None
+            if pending:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            # Drain whatever else is already queued into the same batch
+            items = []
+            batch = []
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                    break
+                items.append(item)
+                batch.append(self.formatter(item))
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if batch:
+                with profiler.span("csv.write"):
+                    self._write(items, batch)
+                pending += len(batch)
+                self.rows_written += len(batch)
+                if self.latency is not None:
+                    done = time.time_ns()
+                    for item in items:
+                        self.latency.observe(done - int(item[0].timestamp() * 1e6) * 1000)
+
+            if pending and (pending >= self.flush_rows
+                            or time.monotonic() - last_flush >= self.flush_interval):
+                with profiler.span("csv.flush"):
+                    self._flush(self.fsync == "flush")
+                pending = 0
+                last_flush = time.monotonic()
+                if self.rotation is not None and self.rotation.oversize(self._f.tell()):
+                    self._rotate()
+
+        # Final flush so the tail of the log is never lost
+        self._close_file()
+        if self.rotation is not None:
+            self.rotation.close()
@@ -0,0 +1,207 @@
+# metrics.py
+# Counters and latency histograms of the logger, served as Prometheus text and JSON
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Recording is a plain attribute update (a counter) or a bisect into a short
+# bucket list (a histogram), so it can sit on the serial hot path. Each metric
+# is written by one thread only; a scrape may read a value mid-update, which
+# is harmless for monitoring. Values that already exist elsewhere (e.g. ring
+# buffer evictions) are registered as callbacks and only read when scraped.
+
+# Import Necessary Modules
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ADDRESS = ("127.0.0.1", 9108)
+# Histogram bucket upper bounds (ns): 1-2-5 steps from 1 us to 10 s
+LATENCY_BUCKETS_NS = tuple(m * 10 ** e for e in range(3, 10) for m in (1, 2, 5)) + (10 ** 10,)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+# Counts observations (ns) per bucket; rendered in seconds
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS_NS):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)     # the last one is +Inf
+        self.sum = 0
+        self.count = 0
+
+    # n observations of `value` (e.g. a batch timed as a whole, per item)
+    def observe(self, value, n=1):
+        self.counts[bisect.bisect_left(self.bounds, value)] += n
+        self.sum += value * n
+        self.count += n
+
+    # Estimated q-quantile (ns), interpolated within its bucket; None if empty
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = self.bounds[i - 1] if i else 0
+                hi = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+
+# A value read from elsewhere at scrape time
+class Callback:
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    @property
+    def value(self):
+        return self.fn()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+# Metric families by name; each holds one metric per label set. Asking for an
+# existing name and label set returns the same metric.
+class MetricsRegistry:
+    def __init__(self):
+        self._families = {}     # name -> [type, help, {labels: metric}]
+        self._lock = threading.Lock()
+
+    def _get(self, name, kind, help, labels, factory):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, [kind, help, {}])
+            if family[0] != kind:
+                raise ValueError(f"metric {name!r} is a {family[0]}, not a {kind}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = factory()
+            return metric
+
+    def counter(self, name, help, **labels):
+        return self._get(name, "counter", help, labels, Counter)
+
+    # Histogram of durations in ns; name it *_seconds, as it is rendered in seconds
+    def histogram(self, name, help, bounds=LATENCY_BUCKETS_NS, **labels):
+        return self._get(name, "histogram", help, labels, lambda: Histogram(bounds))
+
+    # A counter or gauge whose value is fn() at scrape time (replaces an earlier fn)
+    def callback(self, name, help, fn, kind="counter", **labels):
+        metric = self._get(name, kind, help, labels, lambda: Callback(fn))
+        metric.fn = fn
+        return metric
+
+    def _snapshot(self):
+        with self._lock:
+            return [(name, kind, help, list(metrics.items()))
+                    for name, (kind, help, metrics) in sorted(self._families.items())]
+
+    # Prometheus text exposition format
+    def render(self):
+        lines = []
+        for name, kind, help, metrics in self._snapshot():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics:
+                if kind != "histogram":
+                    lines.append(f"{name}{_label_text(labels)} {metric.value}")
+                    continue
+                cumulative = 0
+                for bound, n in zip(metric.bounds + ["+Inf"], metric.counts):
+                    cumulative += n
+                    le = bound if bound == "+Inf" else repr(bound / 1e9)
+                    lines.append(f"{name}_bucket{_label_text(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels)} {metric.sum / 1e9!r}")
+                lines.append(f"{name}_count{_label_text(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    # Plain dict for scripting: name -> list of {labels, value} (histograms
+    # give count, sum and estimated percentiles in seconds instead of a value)
+    def as_dict(self):
+        result = {}
+        for name, kind, help, metrics in self._snapshot():
+            entries = []
+            for labels, metric in metrics:
+                entry = {"labels": dict(labels)}
+                if kind == "histogram":
+                    entry["count"] = metric.count
+                    entry["sum"] = metric.sum / 1e9
+                    for q in (0.5, 0.95, 0.99):
+                        v = metric.quantile(q)
+                        entry[f"p{round(q * 100)}"] = None if v is None else v / 1e9
+                else:
+                    entry["value"] = metric.value
+                entries.append(entry)
+            result[name] = {"type": kind, "help": help, "metrics": entries}
+        return result
+
+    def to_json(self, indent=None):
+        return json.dumps(self.as_dict(), indent=indent)
+
+    def serve(self, host=DEFAULT_ADDRESS[0], port=DEFAULT_ADDRESS[1]):
+        return MetricsServer(self, host, port).start()
+
+
+# GET /metrics (Prometheus text) and /metrics.json
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        registry = self.server.registry
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/metrics"):
+            body, content_type = registry.render(), PROMETHEUS_CONTENT_TYPE
+        elif path == "/metrics.json":
+            body, content_type = registry.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serves a registry on a local port from a background thread
+class MetricsServer:
+    def __init__(self, registry, host=DEFAULT_ADDRESS[0], port=DEFAULT_ADDRESS[1]):
+        self.registry = registry
+        self._httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.registry = registry
+        self.address = self._httpd.server_address[:2]
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name="metrics-server", daemon=True).start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
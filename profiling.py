@@ -0,0 +1,181 @@
+# profiling.py
+# Opt-in timing of the reader thread, CSV writer and GUI callbacks
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Off unless WEATHER_PROFILE is set (e.g. WEATHER_PROFILE=1 python gui.py) or
+# --profile is given. When off, wrap() hands back the function itself and the
+# inline hooks are an attribute check or an empty `with`, so nothing is timed
+# or stored.
+# When on, every stage run is kept as (stage, thread, start, duration) in a
+# bounded ring: a percentile summary per stage is printed every
+# WEATHER_PROFILE_INTERVAL seconds, and the last TRACE_WINDOW seconds are
+# written as a Chrome trace (chrome://tracing, ui.perfetto.dev) to
+# WEATHER_PROFILE_TRACE at exit and on SIGUSR1.
+
+# Import Necessary Modules
+import atexit
+import functools
+import json
+import os
+import signal
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+ENV_VAR = "WEATHER_PROFILE"
+INTERVAL_ENV_VAR = "WEATHER_PROFILE_INTERVAL"
+TRACE_ENV_VAR = "WEATHER_PROFILE_TRACE"
+REPORT_INTERVAL = 30.0      # seconds between summaries
+TRACE_WINDOW = 60.0         # seconds of events written to the trace
+MAX_EVENTS = 200000         # events kept for traces (oldest dropped first)
+
+
+# Times one `with` block
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Profiler:
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)     # (name, thread id, start ns, duration ns)
+        self._window = {}       # name -> durations (ns) since the last summary
+        self._threads = {}      # thread id -> name, kept for threads that have ended
+        self._reporter = None
+        self._trace_path = None
+
+    # Start timing; optionally print summaries every report_interval seconds
+    # and write a trace to trace_path at exit (and on SIGUSR1 where available)
+    def enable(self, report_interval=REPORT_INTERVAL, trace_path=None, out=print):
+        self.enabled = True
+        if report_interval and self._reporter is None:
+            self._reporter = threading.Thread(target=self._report_loop, args=(report_interval, out),
+                                              name="profiler", daemon=True)
+            self._reporter.start()
+        if trace_path and self._trace_path is None:
+            self._trace_path = trace_path
+            atexit.register(self.dump_trace, trace_path)
+            if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGUSR1, lambda *_: self.dump_trace(trace_path))
+        return self
+
+    def record(self, name, start, end):
+        duration = end - start
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        self.events.append((name, tid, start, duration))
+        window = self._window.get(name)
+        if window is None:
+            window = self._window[name] = []
+        window.append(duration)
+
+    # Context manager timing a block as stage `name`
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NO_SPAN
+
+    # Decorator timing every call as stage `name` (default: the function's
+    # name); returns the function unchanged if profiling is off at that point
+    def wrap(self, name=None):
+        def decorate(fn):
+            if not self.enabled:
+                return fn
+            stage = name or fn.__name__
+
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(stage, start, time.perf_counter_ns())
+            return timed
+        return decorate
+
+    # Per-stage count, total and percentiles (ms / us) since the last reset
+    def summary(self, reset=True):
+        window = self._window
+        if reset:
+            self._window = {}
+        result = {}
+        for name, durations in sorted(window.items()):
+            us = np.asarray(durations, dtype=np.float64) / 1e3
+            p50, p95, p99 = np.percentile(us, (50, 95, 99))
+            result[name] = {"count": len(us), "total_ms": float(us.sum()) / 1e3, "p50_us": float(p50),
+                            "p95_us": float(p95), "p99_us": float(p99), "max_us": float(us.max())}
+        return result
+
+    def report(self, reset=True):
+        rows = self.summary(reset)
+        lines = [f"{'stage':<28}{'count':>8}{'total ms':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'max us':>10}"]
+        for name, s in rows.items():
+            lines.append(f"{name:<28}{s['count']:>8}{s['total_ms']:>10.1f}{s['p50_us']:>10.1f}"
+                         f"{s['p95_us']:>10.1f}{s['p99_us']:>10.1f}{s['max_us']:>10.1f}")
+        return "\n".join(lines)
+
+    def _report_loop(self, interval, out):
+        while True:
+            time.sleep(interval)
+            if self._window:
+                out(self.report())
+
+    # Chrome trace (JSON object format) of the events in the last `seconds`,
+    # or between perf_counter_ns times start and end
+    def dump_trace(self, path, seconds=TRACE_WINDOW, start=None, end=None):
+        if start is None and seconds is not None:
+            start = time.perf_counter_ns() - int(seconds * 1e9)
+        pid = os.getpid()
+        events = []
+        tids = set()
+        for name, tid, t0, duration in list(self.events):
+            if (start is not None and t0 < start) or (end is not None and t0 > end):
+                continue
+            tids.add(tid)
+            events.append({"name": name, "ph": "X", "ts": t0 / 1e3, "dur": duration / 1e3,
+                           "pid": pid, "tid": tid})
+        spans = len(events)
+        for tid in tids:
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": self._threads.get(tid, str(tid))}})
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return spans
+
+
+# Shared by every module; switched on from the environment at import
+profiler = Profiler()
+
+
+def enable_from_env():
+    if os.environ.get(ENV_VAR, "") not in ("", "0"):
+        profiler.enable(float(os.environ.get(INTERVAL_ENV_VAR, REPORT_INTERVAL)),
+                        os.environ.get(TRACE_ENV_VAR))
+
+
+enable_from_env()
@@ -0,0 +1,171 @@
+# resample.py
+# Samples on a uniform time grid, with masks of the gaps in the feed
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Samples are stamped when the reader gets them, and the firmware cadence
+# drifts (delay(500) plus the sensor reads), so the raw series is irregular and
+# a dropped feed just looks like a longer line. resample() bins the samples of
+# every channel onto a grid of `step` seconds aligned to multiples of step
+# (like the rollup buckets) and aggregates each bin in one vectorised pass. A
+# bin with no samples is a gap when the feed was silent for longer than
+# max_gap around it (by default GAP_FACTOR times the median sample interval);
+# other empty bins are only missed by cadence jitter and can be filled from
+# their neighbours. Gaps always stay NaN.
+
+# Import Necessary Modules
+from typing import NamedTuple
+
+import numpy as np
+
+AGGREGATIONS = ("mean", "min", "max", "first", "last")
+FILLS = ("none", "previous", "linear", "nearest")
+GAP_FACTOR = 3
+
+
+# Channels on a uniform grid; columns and filled map channel -> array
+class Resampled(NamedTuple):
+    step: float             # grid spacing (s)
+    timestamps: np.ndarray  # bin start (epoch ns)
+    columns: dict           # value per bin, NaN where missing
+    count: np.ndarray       # samples per bin
+    gap: np.ndarray         # True for bins inside a dropout of the feed
+    filled: dict            # True for bins whose value was filled in
+
+
+# Median time between samples (ns), ignoring repeated stamps (e.g. a burst read
+# stamped at once), or None if there are no two distinct stamps
+def sample_interval(timestamps):
+    diffs = np.diff(np.asarray(timestamps, dtype=np.int64))
+    diffs = diffs[diffs > 0]
+    if not diffs.size:
+        return None
+    return int(np.median(diffs))
+
+
+# Dropouts longer than max_gap (ns) as (starts, ends): the last sample before
+# and first sample after each one (timestamps ascending)
+def find_gaps(timestamps, max_gap):
+    ts = np.asarray(timestamps, dtype=np.int64)
+    i = np.flatnonzero(np.diff(ts) > max_gap)
+    return ts[i], ts[i + 1]
+
+
+# One value per bin from the samples in it; bins are the (ascending) bin
+# indices of the samples, starts the first sample of each occupied bin and
+# count the samples per bin
+def _aggregate(values, bins, starts, count, how):
+    n_bins = count.size
+    if how == "mean":
+        valid = ~np.isnan(values)
+        if valid.all():
+            total, n = np.bincount(bins, weights=values, minlength=n_bins), count
+        else:
+            total = np.bincount(bins, weights=np.where(valid, values, 0.0), minlength=n_bins)
+            n = np.bincount(bins, weights=valid, minlength=n_bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return total / n
+    out = np.full(n_bins, np.nan)
+    if not starts.size:
+        return out
+    occupied = bins[starts]
+    if how == "min":
+        out[occupied] = np.fmin.reduceat(values, starts)
+    elif how == "max":
+        out[occupied] = np.fmax.reduceat(values, starts)
+    elif how == "first":
+        out[occupied] = values[starts]
+    else:
+        out[occupied] = values[np.append(starts[1:], values.size) - 1]
+    return out
+
+
+# Fill the NaN bins of `out` flagged in `missing` from the known bins, in place;
+# returns the mask of bins filled
+def _fill(out, missing, fill):
+    known = np.flatnonzero(~np.isnan(out))
+    todo = np.flatnonzero(missing & np.isnan(out))
+    filled = np.zeros(out.size, dtype=bool)
+    if not known.size or not todo.size:
+        return filled
+    if fill == "linear":
+        # Only between known bins: the ends are not extrapolated
+        todo = todo[(todo > known[0]) & (todo < known[-1])]
+        out[todo] = np.interp(todo, known, out[known])
+    elif fill == "previous":
+        j = np.searchsorted(known, todo) - 1
+        todo, j = todo[j >= 0], j[j >= 0]
+        out[todo] = out[known[j]]
+    else:
+        j = np.searchsorted(known, todo)
+        after = known[np.minimum(j, known.size - 1)]
+        before = known[np.maximum(j - 1, 0)]
+        nearest = np.where((j == known.size) | ((j > 0) & (todo - before <= after - todo)), before, after)
+        out[todo] = out[nearest]
+    filled[todo] = True
+    return filled
+
+
+# Resample channels ({channel: values}, timestamps in epoch ns) onto a grid of
+# `step` seconds from t0 to t1 (epoch ns; default: the data), aggregating each
+# bin by `how` and filling empty bins that are not gaps by `fill`. max_gap
+# (ns) is the silence that counts as a dropout.
+def resample(timestamps, columns, step, how="mean", fill="none", t0=None, t1=None, max_gap=None):
+    if how not in AGGREGATIONS:
+        raise ValueError(f"how must be one of {AGGREGATIONS}, got {how!r}")
+    if fill not in FILLS:
+        raise ValueError(f"fill must be one of {FILLS}, got {fill!r}")
+    step_ns = int(step * 1_000_000_000)
+    if step_ns <= 0:
+        raise ValueError(f"step must be positive, got {step!r}")
+    ts = np.asarray(timestamps, dtype=np.int64)
+    columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+    if ts.size > 1 and np.any(ts[1:] < ts[:-1]):
+        # The wall clock stepped back: put the samples in time order
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        columns = {name: values[order] for name, values in columns.items()}
+    if t0 is None or t1 is None:
+        if not ts.size:
+            empty = np.zeros(0)
+            return Resampled(step, np.zeros(0, dtype=np.int64), {name: empty for name in columns},
+                             np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool),
+                             {name: empty.astype(bool) for name in columns})
+        t0 = int(ts[0]) if t0 is None else t0
+        t1 = int(ts[-1]) if t1 is None else t1
+    t0 -= t0 % step_ns
+    n_bins = max((t1 - t0) // step_ns + 1, 0)
+    grid = t0 + np.arange(n_bins, dtype=np.int64) * step_ns
+
+    lo = int(np.searchsorted(ts, t0, side="left"))
+    hi = int(np.searchsorted(ts, t0 + n_bins * step_ns, side="left"))
+    bins = ((ts[lo:hi] - t0) // step_ns).astype(np.intp)
+    count = np.bincount(bins, minlength=n_bins)
+    starts = np.flatnonzero(np.diff(bins, prepend=-1))
+
+    # An empty bin is a gap if the samples either side of its centre (from all
+    # of the data, not just the range) are more than max_gap apart
+    if max_gap is None:
+        interval = sample_interval(ts)
+        max_gap = step_ns if interval is None else GAP_FACTOR * interval
+    empty = np.flatnonzero(count == 0)
+    i = np.searchsorted(ts, grid[empty] + step_ns // 2)
+    inside = (i > 0) & (i < ts.size)
+    span = np.zeros(empty.size, dtype=np.int64)
+    span[inside] = ts[i[inside]] - ts[i[inside] - 1]
+    gap = np.zeros(n_bins, dtype=bool)
+    gap[empty[~inside | (span > max_gap)]] = True
+
+    result, filled = {}, {}
+    for name, values in columns.items():
+        out = _aggregate(values[lo:hi], bins, starts, count, how)
+        filled[name] = np.zeros(n_bins, dtype=bool) if fill == "none" else _fill(out, ~gap, fill)
+        result[name] = out
+    return Resampled(step, grid, result, count.astype(np.int64), gap, filled)
+
+
+# resample() of the latest n samples of a RingBuffer (all by default), taken
+# as one consistent (copied) snapshot, as the writer may keep appending
+def resample_buffer(buffer, step, n=None, **kwargs):
+    snap = buffer.snapshot(n, copy=True)
+    return resample(snap.timestamps, snap.columns, step, **kwargs)
@@ -0,0 +1,172 @@
+# ring_buffer.py
+# Fixed-capacity column-oriented ring buffer for sensor samples
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+import numpy as np
+from datetime import datetime
+from typing import NamedTuple
+
+
+# One consistent frame of the latest samples of every channel. version is the
+# total sample count it was taken at: equal versions mean identical data.
+class Snapshot(NamedTuple):
+    version: int
+    timestamps: np.ndarray
+    columns: dict
+
+
+# Ring buffer holding one float64 array per channel plus int64 epoch timestamps (ns).
+# Every sample is written twice (at slot i and slot i + capacity) so that the most
+# recent n samples are always one contiguous slice and readers never need to copy.
+# A single writer thread appends; count is only advanced once a sample is fully
+# written, so it doubles as the version readers check (see snapshot()).
+class RingBuffer:
+    def __init__(self, capacity, channels):
+        self.capacity = int(capacity)
+        self.channels = tuple(channels)
+        self._data = {name: np.zeros(2 * self.capacity, dtype=np.float64) for name in self.channels}
+        self._timestamps = np.zeros(2 * self.capacity, dtype=np.int64)
+        # Total number of samples ever appended; the next slot to write is
+        # count % capacity, so one read of count is a consistent snapshot
+        self.count = 0
+        # Samples the writer has started on: raised before any slot is
+        # written, while count only follows once they are complete
+        self._claimed = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    # Append one sample in O(1); values are given in channel order
+    def append(self, timestamp, values):
+        self._claimed = self.count + 1
+        i = self.count % self.capacity
+        j = i + self.capacity
+        for name, v in zip(self.channels, values):
+            arr = self._data[name]
+            arr[i] = v
+            arr[j] = v
+        self._timestamps[i] = timestamp
+        self._timestamps[j] = timestamp
+        self.count += 1
+
+    # Append many samples at once; columns are given in channel order
+    def extend(self, timestamps, columns):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        n = len(timestamps)
+        self._claimed = self.count + n
+        keep = min(n, self.capacity)
+        slots = (self.count + (n - keep) + np.arange(keep)) % self.capacity
+        for name, col in zip(self.channels, columns):
+            arr = self._data[name]
+            col = np.asarray(col, dtype=np.float64)[n - keep:]
+            arr[slots] = col
+            arr[slots + self.capacity] = col
+        self._timestamps[slots] = timestamps[n - keep:]
+        self._timestamps[slots + self.capacity] = timestamps[n - keep:]
+        self.count += n
+
+    # Contiguous slice bounds of the latest n samples in the doubled arrays
+    def _bounds(self, n=None, count=None):
+        if count is None:
+            count = self.count
+        size = min(count, self.capacity)
+        if n is None or n > size:
+            n = size
+        end = count % self.capacity + self.capacity
+        return end - max(n, 0), end
+
+    # Zero-copy views of the latest n samples: (timestamps, {channel: values})
+    def latest(self, n=None):
+        start, end = self._bounds(n)
+        return self._timestamps[start:end], {name: arr[start:end] for name, arr in self._data.items()}
+
+    # Zero-copy view of a single channel (or "timestamp") over the latest n
+    # samples, optionally as of an earlier observed total count
+    def column(self, name, n=None, count=None):
+        start, end = self._bounds(n, count)
+        if name == "timestamp":
+            return self._timestamps[start:end]
+        return self._data[name][start:end]
+
+    # Samples appended after the total count `count` was observed (at most a
+    # full buffer): (timestamps, {channel: values}, new total count)
+    def since(self, count):
+        now = self.count
+        start, end = self._bounds(now - count, now)
+        return self._timestamps[start:end], {name: arr[start:end] for name, arr in self._data.items()}, now
+
+    # Zero-copy views of all samples with t0 <= timestamp <= t1 (epoch ns)
+    def window(self, t0, t1):
+        start, end = self._bounds()
+        ts = self._timestamps[start:end]
+        lo = start + int(np.searchsorted(ts, t0, side="left"))
+        hi = start + int(np.searchsorted(ts, t1, side="right"))
+        return self._timestamps[lo:hi], {name: arr[lo:hi] for name, arr in self._data.items()}
+
+    # The latest n samples of all channels as of one count, without locking.
+    # Sample k is written to the slot of sample k - capacity, so once the
+    # writer has started on more than capacity - n samples past that count it
+    # is overwriting the oldest ones read (for a full buffer: as soon as it
+    # starts the next one). Like a seqlock, the samples it has started on are
+    # read afterwards and the read retried if it got that far. Views are only
+    # checked up to that point; with copy=True the arrays are copied first (and
+    # so valid forever), which any read of a full buffer that is used later
+    # should do.
+    def snapshot(self, n=None, copy=False):
+        while True:
+            count = self.count
+            start, end = self._bounds(n, count)
+            timestamps = self._timestamps[start:end]
+            columns = {name: arr[start:end] for name, arr in self._data.items()}
+            if copy:
+                timestamps = timestamps.copy()
+                columns = {name: arr.copy() for name, arr in columns.items()}
+            if self._claimed - count <= self.capacity - (end - start):
+                return Snapshot(count, timestamps, columns)
+
+    def clear(self):
+        self.count = 0
+        self._claimed = 0
+
+
+
+# List-like accessor over one channel so code written against the old Python
+# lists (len(), [-1], [-MAX_POINTS:]) keeps working
+class ChannelView:
+    def __init__(self, ring, name):
+        self._ring = ring
+        self._name = name
+
+    def __len__(self):
+        return len(self._ring)
+
+    def __getitem__(self, key):
+        return self._ring.column(self._name)[key]
+
+    def __iter__(self):
+        return iter(self._ring.column(self._name))
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self._ring.column(self._name)
+        return arr if dtype is None else arr.astype(dtype)
+
+
+# List-like accessor giving the old "%H:%M:%S" strings, formatted on demand
+class TimeView(ChannelView):
+    def __init__(self, ring, fmt="%H:%M:%S"):
+        super().__init__(ring, "timestamp")
+        self._fmt = fmt
+
+    def _format(self, ns):
+        return datetime.fromtimestamp(int(ns) / 1e9).strftime(self._fmt)
+
+    def __getitem__(self, key):
+        ts = self._ring.column("timestamp")[key]
+        if isinstance(key, slice):
+            return [self._format(ns) for ns in ts]
+        return self._format(ts)
+
+    def __iter__(self):
+        return (self._format(ns) for ns in self._ring.column("timestamp"))
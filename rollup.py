@@ -0,0 +1,153 @@
+# rollup.py
+# Time-bucketed min/max/mean/count aggregates kept at several resolutions
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+from typing import NamedTuple
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+# (bucket width in seconds, buckets kept): 6 hours of seconds, 14 days of
+# minutes and 2 years of hours, long after the raw ring buffer has wrapped
+DEFAULT_LEVELS = ((1, 6 * 3600), (60, 14 * 24 * 60), (3600, 2 * 365 * 24))
+
+
+# Aggregates of one resolution over a time range; min/max/mean map channel -> array
+class RollupSeries(NamedTuple):
+    width: float            # bucket width (s)
+    timestamps: np.ndarray  # bucket start (epoch ns)
+    count: np.ndarray       # samples per bucket
+    min: dict
+    max: dict
+    mean: dict
+
+
+# One resolution. Closed buckets live in a RingBuffer with columns count and
+# <channel>_min/_max/_sum (its timestamp is the bucket start); the bucket being
+# filled is kept in plain lists until a sample past its end closes it.
+class RollupLevel:
+    def __init__(self, width, capacity, channels):
+        self.width = width
+        self.width_ns = int(width * 1_000_000_000)
+        self.channels = tuple(channels)
+        columns = ["count"] + [f"{ch}_{agg}" for ch in self.channels for agg in ("min", "max", "sum")]
+        self.buckets = RingBuffer(capacity, columns)
+        self.start = None       # start of the open bucket (epoch ns)
+        self.count = 0
+        self.min = self.max = self.sum = None
+
+    # Fold one sample (count 1, lo = hi = total = values) or one closed finer
+    # bucket into this level; returns the bucket it closed, if any, as
+    # (start, count, min, max, sum)
+    def add(self, ts, count, lo, hi, total):
+        start = ts - ts % self.width_ns
+        if self.start is not None and start <= self.start:
+            # Same bucket (or the clock stepped back): keep filling it
+            self.count += count
+            mn, mx, sm = self.min, self.max, self.sum
+            for i, (a, b, c) in enumerate(zip(lo, hi, total)):
+                if a < mn[i]:
+                    mn[i] = a
+                if b > mx[i]:
+                    mx[i] = b
+                sm[i] += c
+            return None
+        closed = self.close()
+        self.start = start
+        self.count = count
+        self.min, self.max, self.sum = list(lo), list(hi), list(total)
+        return closed
+
+    # Move the open bucket into the ring; returns it, or None if there was none
+    def close(self):
+        if self.start is None:
+            return None
+        row = [self.count]
+        for lo, hi, total in zip(self.min, self.max, self.sum):
+            row += (lo, hi, total)
+        self.buckets.append(self.start, row)
+        closed = (self.start, self.count, self.min, self.max, self.sum)
+        self.start = None
+        return closed
+
+    # Oldest bucket start still held (epoch ns), or None when empty
+    @property
+    def oldest(self):
+        if len(self.buckets):
+            return int(self.buckets.column("timestamp")[0])
+        return self.start
+
+    # Buckets overlapping [t0, t1] (epoch ns; None for open ended), including
+    # the open one
+    def series(self, t0=None, t1=None):
+        lo = -2**63 if t0 is None else t0 - t0 % self.width_ns
+        hi = 2**63 - 1 if t1 is None else t1
+        ts, cols = self.buckets.window(lo, hi)
+        count = cols["count"]
+        mins = {ch: cols[f"{ch}_min"] for ch in self.channels}
+        maxs = {ch: cols[f"{ch}_max"] for ch in self.channels}
+        sums = {ch: cols[f"{ch}_sum"] for ch in self.channels}
+        if self.start is not None and lo <= self.start <= hi:
+            ts = np.append(ts, self.start)
+            count = np.append(count, self.count)
+            for i, ch in enumerate(self.channels):
+                mins[ch] = np.append(mins[ch], self.min[i])
+                maxs[ch] = np.append(maxs[ch], self.max[i])
+                sums[ch] = np.append(sums[ch], self.sum[i])
+        means = {ch: sums[ch] / np.maximum(count, 1) for ch in self.channels}
+        return RollupSeries(self.width, ts, count.astype(np.int64), mins, maxs, means)
+
+    def clear(self):
+        self.buckets.clear()
+        self.start = None
+
+
+# Keeps every level up to date as samples arrive: each sample touches only the
+# finest open bucket, and a closed bucket is folded into the next level up, so
+# the cost per sample does not depend on how much history is kept. (A coarse
+# level therefore trails the finer ones by one finer bucket.)
+class RollupStore:
+    def __init__(self, channels, levels=DEFAULT_LEVELS):
+        self.channels = tuple(channels)
+        self.levels = [RollupLevel(width, capacity, self.channels) for width, capacity in levels]
+
+    # One sample, values in channel order
+    def update(self, ts, values):
+        closed = self.levels[0].add(ts, 1, values, values, values)
+        for level in self.levels[1:]:
+            if closed is None:
+                return
+            closed = level.add(*closed)
+
+    # Many samples at once; columns in channel order
+    def extend(self, timestamps, columns):
+        columns = [np.asarray(col, dtype=np.float64).tolist() for col in columns]
+        for ts, values in zip(np.asarray(timestamps, dtype=np.int64).tolist(), zip(*columns)):
+            self.update(ts, values)
+
+    # The level with the given bucket width (s)
+    def level(self, width):
+        for level in self.levels:
+            if level.width == width:
+                return level
+        raise KeyError(f"no rollup level of {width} s")
+
+    # Aggregates over [t0, t1] (epoch ns) from the finest level that needs at
+    # most max_points buckets and still reaches back to t0 (or, if none does,
+    # the one reaching back furthest). Only the buckets in range are touched,
+    # whatever the length of history.
+    def query(self, t0, t1, max_points=1000):
+        span = max(t1 - t0, 0)
+        fitting = [level for level in self.levels if span // level.width_ns < max_points] or self.levels[-1:]
+        for level in fitting:
+            if level.oldest is not None and level.oldest <= t0:
+                return level.series(t0, t1)
+        oldest = [level.oldest if level.oldest is not None else float("inf") for level in fitting]
+        return fitting[oldest.index(min(oldest))].series(t0, t1)
+
+    def clear(self):
+        for level in self.levels:
+            level.clear()
@@ -0,0 +1,293 @@
+# running_stats.py
+# Incremental per-channel statistics fed by the reader thread
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+import math
+from collections import deque
+
+# Time windows longer than this (s) are kept per BUCKET_SECONDS, not per sample
+RAW_WINDOW_SECONDS = 60
+BUCKET_SECONDS = 1
+
+
+# Count, min, max, mean and variance over everything seen (Welford's algorithm)
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x):
+        self.count += 1
+        if self.count == 1:
+            self.min = self.max = x
+        elif x < self.min:
+            self.min = x
+        elif x > self.max:
+            self.max = x
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def summary(self):
+        if self.count == 0:
+            return (None, None, None)
+        return (self.min, self.max, self.mean)
+
+
+# Sliding window statistics in O(1) amortised per sample: monotonic deques give
+# min/max, shifted running sums give mean/variance. Subclasses decide which
+# samples have left the window.
+class _WindowStats:
+    def __init__(self):
+        self._items = deque()    # (key, x)
+        self._mins = deque()     # (key, x) with increasing x
+        self._maxs = deque()     # (key, x) with decreasing x
+        self._shift = None
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def _cutoff(self, key):
+        raise NotImplementedError
+
+    def _push(self, key, x):
+        if self._shift is None:
+            self._shift = x
+        d = x - self._shift
+        self._items.append((key, x))
+        self._sum += d
+        self._sumsq += d * d
+        while self._mins and self._mins[-1][1] >= x:
+            self._mins.pop()
+        self._mins.append((key, x))
+        while self._maxs and self._maxs[-1][1] <= x:
+            self._maxs.pop()
+        self._maxs.append((key, x))
+
+        cutoff = self._cutoff(key)
+        while self._items and self._items[0][0] < cutoff:
+            _, old = self._items.popleft()
+            d = old - self._shift
+            self._sum -= d
+            self._sumsq -= d * d
+        while self._mins[0][0] < cutoff:
+            self._mins.popleft()
+        while self._maxs[0][0] < cutoff:
+            self._maxs.popleft()
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    @property
+    def min(self):
+        return self._mins[0][1] if self._mins else None
+
+    @property
+    def max(self):
+        return self._maxs[0][1] if self._maxs else None
+
+    @property
+    def mean(self):
+        n = len(self._items)
+        return self._shift + self._sum / n if n else 0.0
+
+    @property
+    def variance(self):
+        n = len(self._items)
+        if n < 2:
+            return 0.0
+        return max(self._sumsq - self._sum * self._sum / n, 0.0) / (n - 1)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def summary(self):
+        if not self._items:
+            return (None, None, None)
+        return (self.min, self.max, self.mean)
+
+
+# Statistics over the last `size` samples
+class SampleWindowStats(_WindowStats):
+    def __init__(self, size):
+        super().__init__()
+        self.size = int(size)
+        self._seq = 0
+
+    def _cutoff(self, key):
+        return key - self.size + 1
+
+    def update(self, x):
+        self._push(self._seq, x)
+        self._seq += 1
+
+
+# Statistics over the last `seconds` seconds (timestamps in epoch ns)
+class TimeWindowStats(_WindowStats):
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+        self._span_ns = int(seconds * 1e9)
+
+    def _cutoff(self, key):
+        return key - self._span_ns
+
+    def update(self, timestamp, x):
+        self._push(timestamp, x)
+
+
+# Statistics over the last `seconds` seconds kept as one aggregate (count,
+# min, max, shifted sums) per `bucket` seconds instead of one entry per
+# sample, so memory and cost stay the same at any sample rate. Buckets leave
+# whole: the window is `seconds` long plus the part of the oldest bucket
+# still in it (at most one bucket more). Min/max come from monotonic deques
+# over the closed buckets and the open one.
+class BucketedTimeWindowStats:
+    def __init__(self, seconds, bucket=BUCKET_SECONDS):
+        self.seconds = seconds
+        self.bucket = bucket
+        self._span_ns = int(seconds * 1e9)
+        self._bucket_ns = int(bucket * 1e9)
+        self._buckets = deque()  # closed buckets: [start, count, min, max, sum, sumsq]
+        self._mins = deque()     # (start, min) with increasing min
+        self._maxs = deque()     # (start, max) with decreasing max
+        self._open = None        # bucket being filled, same layout
+        self._shift = None
+        self._count = 0          # totals over the closed buckets
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def update(self, timestamp, x):
+        if self._shift is None:
+            self._shift = x
+        d = x - self._shift
+        start = timestamp - timestamp % self._bucket_ns
+        b = self._open
+        if b is None or start > b[0]:
+            if b is not None:
+                self._close(b)
+            b = self._open = [start, 0, x, x, 0.0, 0.0]
+        # (a sample from before the open bucket, the clock having stepped
+        # back, is kept in the open bucket)
+        b[1] += 1
+        if x < b[2]:
+            b[2] = x
+        if x > b[3]:
+            b[3] = x
+        b[4] += d
+        b[5] += d * d
+
+        cutoff = timestamp - self._span_ns
+        buckets = self._buckets
+        while buckets and buckets[0][0] + self._bucket_ns <= cutoff:
+            old = buckets.popleft()
+            self._count -= old[1]
+            self._sum -= old[4]
+            self._sumsq -= old[5]
+        oldest = buckets[0][0] if buckets else b[0]
+        while self._mins and self._mins[0][0] < oldest:
+            self._mins.popleft()
+        while self._maxs and self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+
+    def _close(self, b):
+        self._buckets.append(b)
+        self._count += b[1]
+        self._sum += b[4]
+        self._sumsq += b[5]
+        while self._mins and self._mins[-1][1] >= b[2]:
+            self._mins.pop()
+        self._mins.append((b[0], b[2]))
+        while self._maxs and self._maxs[-1][1] <= b[3]:
+            self._maxs.pop()
+        self._maxs.append((b[0], b[3]))
+
+    @property
+    def count(self):
+        return self._count + (self._open[1] if self._open is not None else 0)
+
+    @property
+    def min(self):
+        if self._open is None:
+            return None
+        return min(self._mins[0][1], self._open[2]) if self._mins else self._open[2]
+
+    @property
+    def max(self):
+        if self._open is None:
+            return None
+        return max(self._maxs[0][1], self._open[3]) if self._maxs else self._open[3]
+
+    @property
+    def mean(self):
+        n = self.count
+        return self._shift + (self._sum + self._open[4]) / n if n else 0.0
+
+    @property
+    def variance(self):
+        n = self.count
+        if n < 2:
+            return 0.0
+        total = self._sum + self._open[4]
+        return max(self._sumsq + self._open[5] - total * total / n, 0.0) / (n - 1)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def summary(self):
+        if not self.count:
+            return (None, None, None)
+        return (self.min, self.max, self.mean)
+
+
+# All statistics kept for one channel; time windows longer than
+# RAW_WINDOW_SECONDS are bucketed
+class ChannelStats:
+    def __init__(self, sample_windows=(100, 200), time_windows=()):
+        self.overall = RunningStats()
+        self.samples = {n: SampleWindowStats(n) for n in sample_windows}
+        self.times = {s: TimeWindowStats(s) if s <= RAW_WINDOW_SECONDS else BucketedTimeWindowStats(s)
+                      for s in time_windows}
+
+    def update(self, timestamp, x):
+        self.overall.update(x)
+        for w in self.samples.values():
+            w.update(x)
+        for w in self.times.values():
+            w.update(timestamp, x)
+
+
+# Per-channel statistics for every sample accepted by the reader thread
+class SensorStats:
+    def __init__(self, channels, sample_windows=(100, 200), time_windows=()):
+        self.channels = tuple(channels)
+        self.sample_windows = tuple(sample_windows)
+        self.time_windows = tuple(time_windows)
+        self.clear()
+
+    # Forget every sample seen so far
+    def clear(self):
+        self._stats = {name: ChannelStats(self.sample_windows, self.time_windows) for name in self.channels}
+
+    def __getitem__(self, name):
+        return self._stats[name]
+
+    # values are given in channel order
+    def update(self, timestamp, values):
+        for name, x in zip(self.channels, values):
+            self._stats[name].update(timestamp, x)
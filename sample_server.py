@@ -0,0 +1,206 @@
+# sample_server.py
+# Local TCP link between the headless logger and GUI clients
+# SF4: Data Logger
+# jz587 and ak2444
+
+# The stream uses the binary log format: a header, then one fixed-width record
+# per sample. A new client first receives every sample in the logger's buffer,
+# then each new sample as it is accepted. A client that falls more than
+# CLIENT_QUEUE samples behind (a stalled GUI) is disconnected, so it cannot
+# make the logger's memory grow.
+
+# Import Necessary Modules
+import queue
+import socket
+import threading
+
+import numpy as np
+
+from binary_log import CHANNELS, HEADER_SIZE, RECORD_DTYPE, RECORD_STRUCT, check_header, header_bytes
+
+DEFAULT_ADDRESS = ("127.0.0.1", 8765)
+CLIENT_QUEUE = 10000        # samples queued per client before it is dropped
+RECONNECT_DELAY = 0.5       # first wait (s) before a client reconnects, doubled per failure
+MAX_RECONNECT_DELAY = 10.0
+
+
+# Publishes samples from the logger's ring buffer to any connected clients
+class SampleServer:
+    def __init__(self, ring, host=DEFAULT_ADDRESS[0], port=DEFAULT_ADDRESS[1], client_queue=CLIENT_QUEUE):
+        self.ring = ring
+        self.client_queue = client_queue
+        self.dropped_clients = 0    # clients disconnected for falling behind
+        self._clients = []          # (queue, connection)
+        self._lock = threading.Lock()
+        self._sock = socket.create_server((host, port))
+        self.address = self._sock.getsockname()[:2]
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name="sample-server", daemon=True).start()
+        return self
+
+    # Called from the reader thread after the sample (number seq) was appended
+    def publish(self, seq, timestamp, values):
+        if not self._clients:
+            return
+        record = RECORD_STRUCT.pack(timestamp, *values)
+        with self._lock:
+            for client in list(self._clients):
+                try:
+                    client[0].put_nowait((seq, record))
+                except queue.Full:
+                    self._drop(client)
+
+    # Disconnect a client that fell behind (called with the lock held): its
+    # thread fails on its next send and cleans up
+    def _drop(self, client):
+        self._clients.remove(client)
+        self.dropped_clients += 1
+        try:
+            client[1].shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self._sock.close()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def _serve_client(self, conn):
+        q = queue.Queue(maxsize=self.client_queue)
+        client = (q, conn)
+        # Register before taking the snapshot so no sample can fall in between
+        with self._lock:
+            self._clients.append(client)
+        try:
+            # A checked copy: the reader thread keeps appending meanwhile
+            snap = self.ring.snapshot(copy=True)
+            count = snap.version
+            backlog = np.empty(len(snap.timestamps), dtype=RECORD_DTYPE)
+            backlog["timestamp"] = snap.timestamps
+            for name in CHANNELS:
+                backlog[name] = snap.columns[name]
+            conn.sendall(header_bytes() + backlog.tobytes())
+
+            while True:
+                batch = [q.get()]
+                while not q.empty():
+                    batch.append(q.get_nowait())
+                records = [record for seq, record in batch if seq >= count]
+                if records:
+                    conn.sendall(b"".join(records))
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            conn.close()
+
+
+# Receives samples from a running logger into a local ring buffer (and stats,
+# rollups and alerts). If the connection is lost (the logger restarted, or
+# dropped this client for falling behind) it reconnects with backoff; the
+# local state is cleared first and rebuilt from the logger's backlog, and
+# `connected` is False in between.
+class SampleClient:
+    def __init__(self, ring, stats=None, host=DEFAULT_ADDRESS[0], port=DEFAULT_ADDRESS[1], rollups=None,
+                 alerts=None):
+        self.ring = ring
+        self.stats = stats
+        self.rollups = rollups
+        self.alerts = alerts
+        self.address = (host, port)
+        self.connected = False
+        self.reconnects = 0
+        self._sock = None
+        self._closed = threading.Event()
+
+    # Raises OSError if no logger is listening
+    def start(self, timeout=1.0):
+        self._connect(timeout)
+        threading.Thread(target=self._run, name="sample-client", daemon=True).start()
+        return self
+
+    def close(self):
+        self._closed.set()
+        if self._sock is not None:
+            self._sock.close()
+
+    def _connect(self, timeout=1.0):
+        self._sock = socket.create_connection(self.address, timeout=timeout)
+        self._sock.settimeout(None)
+        self.connected = True
+
+    def _recv_exact(self, n):
+        data = bytearray()
+        while len(data) < n:
+            chunk = self._sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("logger closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._receive()
+            self.connected = False
+            if self._closed.is_set():
+                return
+            delay = RECONNECT_DELAY
+            while not self._closed.wait(delay):
+                try:
+                    self._connect()
+                except OSError:
+                    delay = min(2 * delay, MAX_RECONNECT_DELAY)
+                    continue
+                self.reconnects += 1
+                print("Reconnected to logger at %s:%d" % self.address)
+                self._reset()
+                break
+
+    # Samples seen before the connection was lost are replaced by the backlog
+    # the logger sends again
+    def _reset(self):
+        self.ring.clear()
+        for state in (self.stats, self.rollups, self.alerts):
+            if state is not None:
+                state.clear()
+
+    # Read one connection until it is lost
+    def _receive(self):
+        size = RECORD_DTYPE.itemsize
+        pending = bytearray()
+        try:
+            check_header(self._recv_exact(HEADER_SIZE), "%s:%d" % self.address)
+            while True:
+                chunk = self._sock.recv(1 << 16)
+                if not chunk:
+                    break
+                pending += chunk
+                n = len(pending) // size
+                if n:
+                    self._store(np.frombuffer(bytes(pending[:n * size]), dtype=RECORD_DTYPE))
+                    del pending[:n * size]
+        except (OSError, ValueError) as e:
+            if not self._closed.is_set():
+                print("Lost connection to logger:", e)
+        finally:
+            self._sock.close()
+
+    def _store(self, records):
+        self.ring.extend(records["timestamp"], [records[name] for name in self.ring.channels])
+        if self.stats is not None:
+            columns = [records[name].tolist() for name in self.stats.channels]
+            for ts, values in zip(records["timestamp"].tolist(), zip(*columns)):
+                self.stats.update(ts, values)
+        if self.rollups is not None:
+            self.rollups.extend(records["timestamp"], [records[name] for name in self.rollups.channels])
+        if self.alerts is not None:
+            self.alerts.extend(records["timestamp"], [records[name] for name in self.alerts.channels])
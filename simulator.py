@@ -0,0 +1,241 @@
+# simulator.py
+# Stand-in for the Arduino: generates sensor frames without hardware
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+import os
+import random
+import threading
+import time
+
+from binary_protocol import FRAME_SIZE, encode_frame
+from frame_parser import Sample, xor_checksum
+
+# Ways a generated line can be broken
+FAULTS = ("bad_checksum", "missing_checksum", "invalid_checksum", "wrong_field_count", "bad_value", "truncated")
+
+
+# Build one line exactly as final_firmware.ino prints it
+def make_frame(hum, temp, lux, pres, wind):
+    payload = f"HUM:{hum:.1f} T:{temp:.1f} LUX:{lux:.1f} PRES:{pres:.1f} WIND:{wind:.2f}"
+    data = payload.encode('ascii')
+    return data + b" CHK:%02X\r\n" % xor_checksum(data)
+
+
+# Random-walk sensor values, with a share of corrupted checksums and malformed lines.
+# With binary=True frames use binary_protocol instead of text lines; a corrupted
+# frame has one byte flipped and every malformed one is truncated.
+class FrameGenerator:
+    def __init__(self, corrupt_rate=0.0, malformed_rate=0.0, seed=None, binary=False):
+        self.corrupt_rate = corrupt_rate
+        self.malformed_rate = malformed_rate
+        self.binary = binary
+        self._rng = random.Random(seed)
+        self._state = {"hum": 50.0, "temp": 22.0, "lux": 300.0, "pres": 1013.0, "wind": 0.5}
+        self.frames = 0
+        self.faults = dict.fromkeys(FAULTS, 0)
+
+    def _step(self):
+        s, rng = self._state, self._rng
+        s["hum"] = min(max(s["hum"] + rng.gauss(0, 0.3), 0.0), 100.0)
+        s["temp"] += rng.gauss(0, 0.05)
+        s["lux"] = max(s["lux"] + rng.gauss(0, 5.0), 0.0)
+        s["pres"] += rng.gauss(0, 0.05)
+        s["wind"] = min(max(s["wind"] + rng.gauss(0, 0.05), 0.0), 5.0)
+        return s
+
+    def _binary_fault(self, kind, frame):
+        self.faults[kind] += 1
+        if kind == "bad_checksum":
+            i = self._rng.randrange(2, FRAME_SIZE)
+            return frame[:i] + bytes([frame[i] ^ 0x10]) + frame[i + 1:]
+        return frame[:self._rng.randrange(1, FRAME_SIZE)]
+
+    def _fault(self, kind, line):
+        self.faults[kind] += 1
+        payload = line[:line.index(b" CHK:")]
+        if kind == "bad_checksum":
+            return payload + b" CHK:%02X\r\n" % (xor_checksum(payload) ^ 0x5A)
+        if kind == "missing_checksum":
+            return payload + b"\r\n"
+        if kind == "invalid_checksum":
+            return payload + b" CHK:ZZ\r\n"
+        if kind == "wrong_field_count":
+            payload = payload.rsplit(b" ", 1)[0]
+        elif kind == "bad_value":
+            payload = payload.replace(b"T:", b"T:x", 1)
+        else:
+            return line[:self._rng.randrange(1, len(line) - 2)] + b"\r\n"
+        return payload + b" CHK:%02X\r\n" % xor_checksum(payload)
+
+    def next_line(self):
+        s = self._step()
+        r = self._rng.random()
+        if self.binary:
+            line = encode_frame(self.frames, Sample(s["temp"], s["hum"], s["pres"], s["lux"], s["wind"]))
+            self.frames += 1
+            if r < self.corrupt_rate:
+                return self._binary_fault("bad_checksum", line)
+            if r < self.corrupt_rate + self.malformed_rate:
+                return self._binary_fault("truncated", line)
+            return line
+        line = make_frame(s["hum"], s["temp"], s["lux"], s["pres"], s["wind"])
+        self.frames += 1
+        if r < self.corrupt_rate:
+            return self._fault("bad_checksum", line)
+        if r < self.corrupt_rate + self.malformed_rate:
+            return self._fault(self._rng.choice(FAULTS[1:]), line)
+        return line
+
+
+# Loopback object with the subset of the serial.Serial API the reader uses.
+# Lines become available at `rate` per second (None: as fast as they are read)
+# until `count` lines have been produced; commands written are kept in .commands.
+class SimulatedSerial:
+    def __init__(self, port=None, baudrate=9600, timeout=1, rate=2.0, count=None,
+                 corrupt_rate=0.0, malformed_rate=0.0, seed=None, generator=None, binary=False):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.rate = rate
+        self.count = count
+        self.generator = generator or FrameGenerator(corrupt_rate, malformed_rate, seed, binary)
+        self.commands = []
+        self.emitted = []           # perf_counter_ns when each line arrived at the port
+        self.record_times = False
+        self.is_open = True
+        self._pending = bytearray()
+        self._produced = 0
+        self._start = time.perf_counter()
+
+    @property
+    def exhausted(self):
+        return self.count is not None and self._produced >= self.count
+
+    # Number of complete lines due by now
+    def _due(self):
+        if self.rate is None:
+            return None
+        return int((time.perf_counter() - self._start) * self.rate) + 1
+
+    def _produce(self, n):
+        for _ in range(n):
+            if self.exhausted:
+                return
+            self._pending += self.generator.next_line()
+            if self.record_times:
+                # Lines "arrive" on schedule even if nobody polled at that moment
+                if self.rate is None:
+                    self.emitted.append(time.perf_counter_ns())
+                else:
+                    self.emitted.append(int((self._start + self._produced / self.rate) * 1e9))
+            self._produced += 1
+
+    # Wait (up to the timeout) until at least one more line is due
+    def _fill(self):
+        if self.exhausted:
+            if not self._pending and self.timeout:
+                time.sleep(self.timeout)
+            return
+        due = self._due()
+        if due is None:
+            self._produce(1)
+            return
+        if due <= self._produced:
+            wait = (self._produced / self.rate) - (time.perf_counter() - self._start)
+            if self.timeout is not None and wait > self.timeout:
+                time.sleep(self.timeout)
+                return
+            time.sleep(max(wait, 0.0))
+            due = self._due()
+        self._produce(due - self._produced)
+
+    # Unthrottled simulators always have a backlog of up to BACKLOG lines waiting
+    BACKLOG = 64
+
+    @property
+    def in_waiting(self):
+        if not self.exhausted:
+            due = self._due()
+            if due is None:
+                due = self._produced + (0 if self._pending else self.BACKLOG)
+            self._produce(due - self._produced)
+        return len(self._pending)
+
+    # Text protocol only: binary frames are not newline terminated
+    def readline(self):
+        if b"\n" not in self._pending:
+            self._fill()
+        end = self._pending.find(b"\n") + 1
+        if end == 0:
+            line, self._pending = bytes(self._pending), bytearray()
+        else:
+            line = bytes(self._pending[:end])
+            del self._pending[:end]
+        return line
+
+    def read(self, size=1):
+        if not self._pending:
+            self._fill()
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def write(self, data):
+        self.commands.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._pending.clear()
+
+    def close(self):
+        self.is_open = False
+
+
+# Factory for Device(serial_factory=...): every port opened gets its own simulator
+def simulated_serial_factory(**options):
+    def factory(port, baudrate, timeout=1):
+        return SimulatedSerial(port, baudrate, timeout, **options)
+    return factory
+
+
+# Feeds generated frames into a pseudo-terminal so unmodified code can open
+# .port like a real serial device (POSIX only)
+class PtySimulator:
+    def __init__(self, rate=2.0, count=None, corrupt_rate=0.0, malformed_rate=0.0, seed=None,
+                 binary=False):
+        import tty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.rate = rate
+        self.count = count
+        self.generator = FrameGenerator(corrupt_rate, malformed_rate, seed, binary)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pty-simulator", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        interval = 1.0 / self.rate if self.rate else 0.0
+        next_due = time.monotonic()
+        sent = 0
+        while not self._stop.is_set() and (self.count is None or sent < self.count):
+            os.write(self._master, self.generator.next_line())
+            sent += 1
+            next_due += interval
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
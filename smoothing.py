@@ -0,0 +1,186 @@
+# smoothing.py
+# Moving average / smoothing filters for the sensor series
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Import Necessary Modules
+import bisect
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ring_buffer import RingBuffer
+
+KINDS = ("sma", "ema", "median")
+
+
+# Simple moving average in O(n) using a cumulative sum; the first window-1
+# samples are passed through unchanged (as the original gui.moving_avg did)
+def sma(data, window):
+    x = np.asarray(data, dtype=np.float64)
+    window = int(window)
+    out = x.copy()
+    if window <= 1 or x.size < window:
+        return out
+    csum = np.cumsum(np.concatenate(([0.0], x)))
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+# Exponential moving average with alpha = 2 / (window + 1), seeded with the
+# first sample. Evaluated in closed form block by block so no Python loop
+# runs per sample; blocks are sized so that decay**-block stays finite.
+def ema(data, window):
+    x = np.asarray(data, dtype=np.float64)
+    alpha = 2.0 / (int(window) + 1)
+    if x.size == 0 or alpha >= 1.0:
+        return x.copy()
+    decay = 1.0 - alpha
+    block = min(x.size, max(1, int(500 / -np.log(decay))))
+    powers = decay ** -np.arange(block, dtype=np.float64)
+    out = np.empty_like(x)
+    prev = x[0]
+    for start in range(0, x.size, block):
+        seg = x[start:start + block]
+        p = powers[:seg.size]
+        out[start:start + seg.size] = (decay * prev + alpha * np.cumsum(seg * p)) / p
+        prev = out[start + seg.size - 1]
+    return out
+
+
+# Rolling median; the first window-1 samples are passed through unchanged
+def median(data, window):
+    x = np.asarray(data, dtype=np.float64)
+    window = int(window)
+    out = x.copy()
+    if window <= 1 or x.size < window:
+        return out
+    out[window - 1:] = np.median(sliding_window_view(x, window), axis=1)
+    return out
+
+
+_BATCH = {"sma": sma, "ema": ema, "median": median}
+
+
+# Stateful filter: recompute() smooths a whole array at once and primes the
+# state, update() then continues sample by sample (O(1) for sma and ema,
+# O(window) for median)
+class Smoother:
+    def __init__(self, kind="sma", window=5):
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}, got {kind!r}")
+        self.kind = kind
+        self.window = max(int(window), 1)
+        self.alpha = 2.0 / (self.window + 1)
+        self.reset()
+
+    def reset(self):
+        self._recent = deque(maxlen=self.window)
+        self._sorted = []
+        self._sum = 0.0
+        self._ema = None
+
+    def update(self, x):
+        x = float(x)
+        if self.kind == "ema":
+            self._ema = x if self._ema is None else self._ema + self.alpha * (x - self._ema)
+            return self._ema
+
+        if len(self._recent) == self.window:
+            old = self._recent[0]
+            self._sum -= old
+            if self.kind == "median":
+                del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._recent.append(x)
+        self._sum += x
+        if self.kind == "median":
+            bisect.insort(self._sorted, x)
+
+        if len(self._recent) < self.window:
+            return x
+        if self.kind == "median":
+            mid = self.window // 2
+            if self.window % 2:
+                return self._sorted[mid]
+            return 0.5 * (self._sorted[mid - 1] + self._sorted[mid])
+        return self._sum / self.window
+
+    # Smooth the next stretch of a longer series in one batch, continuing from
+    # the current state: the same values update() would give one by one
+    def extend(self, data):
+        x = np.asarray(data, dtype=np.float64)
+        if self.kind == "ema":
+            if x.size == 0:
+                return x.copy()
+            if self._ema is None:
+                out = ema(x, self.window)
+            else:
+                out = ema(np.concatenate(([self._ema], x)), self.window)[1:]
+            self._ema = float(out[-1])
+            return out
+        head = np.array(self._recent, dtype=np.float64)
+        full = np.concatenate((head, x))
+        out = _BATCH[self.kind](full, self.window)[head.size:]
+        self._recent = deque(full[-self.window:].tolist(), maxlen=self.window)
+        self._sum = float(sum(self._recent))
+        self._sorted = sorted(self._recent)
+        return out
+
+    def recompute(self, data):
+        x = np.asarray(data, dtype=np.float64)
+        out = _BATCH[self.kind](x, self.window)
+        self.reset()
+        if self.kind == "ema":
+            self._ema = float(out[-1]) if out.size else None
+        else:
+            for v in x[-self.window:]:
+                self._recent.append(float(v))
+            self._sum = float(sum(self._recent))
+            self._sorted = sorted(self._recent)
+        return out
+
+
+# Smoothed copy of one ring buffer channel, kept up to date incrementally:
+# refresh() only feeds samples appended since the last call through the
+# smoother, falling back to a batch recompute when it has fallen too far behind
+class SmoothedChannel:
+    def __init__(self, ring, name, smoother):
+        self.ring = ring
+        self.name = name
+        self.smoother = smoother
+        self._out = RingBuffer(ring.capacity, ("value",))
+        self._seen = 0
+
+    @property
+    def window(self):
+        return self.smoother.window
+
+    def refresh(self):
+        behind = self.ring.count - self._seen
+        if behind <= 0:
+            if behind < 0:
+                self._rebuild()
+            return
+        if self._seen == 0 or behind >= self.ring.capacity // 2:
+            self._rebuild()
+            return
+        timestamps, columns, self._seen = self.ring.since(self._seen)
+        update = self.smoother.update
+        for ts, v in zip(timestamps.tolist(), columns[self.name].tolist()):
+            self._out.append(ts, (update(v),))
+
+    def _rebuild(self):
+        timestamps, columns, self._seen = self.ring.since(0)
+        self._out.clear()
+        self._out.extend(timestamps, (self.smoother.recompute(columns[self.name]),))
+
+    # Zero-copy view of the latest n smoothed values, optionally as of the
+    # ring's total count `version` (e.g. a RingBuffer.snapshot) so they line
+    # up with raw samples read at that point
+    def latest(self, n=None, version=None):
+        self.refresh()
+        count = self._out.count
+        if version is not None:
+            count -= max(self._seen - version, 0)
+        return self._out.column("value", n, count=count)
@@ -0,0 +1,97 @@
+# ui_scheduler.py
+# Redraw scheduling for the dashboard: only when new samples arrived, only for
+# the page on screen, at most UI_FPS times a second
+# SF4: Data Logger
+# jz587 and ak2444
+
+# Kept free of tkinter imports: it only needs root.after / root.after_cancel.
+
+# Import Necessary Modules
+import time
+
+from profiling import profiler
+
+
+# One timer polls the buffer version (an integer compare) at the target frame
+# rate. When it moved, the tasks of the visible page run once, however many
+# samples arrived in between; hidden pages do no work at all and catch up when
+# shown. Idle ticks cost one comparison, so an idle dashboard uses ~no CPU.
+class UIScheduler:
+    def __init__(self, root, buffer, fps=4):
+        self.root = root
+        self.buffer = buffer
+        self.interval = max(int(1000 / fps), 1)
+        self.visible = None
+        self._tasks = []            # (function, pages or None for every page)
+        self._show_hooks = {}       # page -> functions run when it is shown
+        self._drawn = {}            # page -> buffer version its tasks last ran at
+        self._after = None
+        self.ticks = 0
+        self.runs = 0
+        self.busy_ns = 0            # time spent in tasks and hooks
+
+    # Run fn whenever new data arrived while one of `pages` is visible
+    def add(self, fn, pages=None):
+        self._tasks.append((fn, None if pages is None else frozenset(pages)))
+        return fn
+
+    # Run fn each time `page` is brought on screen (before its tasks)
+    def on_show(self, page, fn):
+        self._show_hooks.setdefault(page, []).append(fn)
+        return fn
+
+    # Called by show_frame: the page's tasks catch up straight away if stale
+    def show(self, page):
+        self.visible = page
+        start = time.perf_counter_ns()
+        for fn in self._show_hooks.get(page, ()):
+            fn()
+        self.busy_ns += time.perf_counter_ns() - start
+        self._run()
+        if profiler.enabled:
+            profiler.record("ui.show", start, time.perf_counter_ns())
+
+    # Forget a page that was torn down: its own tasks, show hooks and state
+    def remove(self, page):
+        only = frozenset((page,))
+        self._tasks = [(fn, pages) for fn, pages in self._tasks if pages != only]
+        self._show_hooks.pop(page, None)
+        self._drawn.pop(page, None)
+        if self.visible == page:
+            self.visible = None
+
+    def start(self):
+        if self._after is None:
+            self._after = self.root.after(self.interval, self._tick)
+        return self
+
+    def stop(self):
+        if self._after is not None:
+            self.root.after_cancel(self._after)
+            self._after = None
+
+    # Mark a page stale so its tasks run on the next tick even without new data
+    def invalidate(self, page=None):
+        if page is None:
+            self._drawn.clear()
+        else:
+            self._drawn.pop(page, None)
+
+    def _tick(self):
+        self.ticks += 1
+        with profiler.span("ui.tick"):
+            self._run()
+        self._after = self.root.after(self.interval, self._tick)
+
+    def _run(self):
+        page = self.visible
+        version = self.buffer.count
+        if page is None or self._drawn.get(page) == version:
+            return
+        self._drawn[page] = version
+        self.runs += 1
+        start = time.perf_counter_ns()
+        for fn, pages in self._tasks:
+            if pages is None or page in pages:
+                fn()
+        self.busy_ns += time.perf_counter_ns() - start